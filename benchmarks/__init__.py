@@ -0,0 +1 @@
+"""Benchmarks for the screen recorder pipeline."""
@@ -0,0 +1,87 @@
+"""
+Benchmark: memory allocated per frame on the capture -> convert path.
+
+Compares the original path (np.array copy of the screenshot, then a fresh
+cvtColor result) with the zero-copy path used by ScreenRecorder (a view of
+the screenshot buffer converted into a reused destination array).
+
+Runs headless with synthetic mss ScreenShot objects:
+
+    python -m benchmarks.bench_frame_copies --width 2560 --height 1440
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from mss.screenshot import ScreenShot
+
+from recorder.pipeline import wrap_screenshot
+
+
+def legacy_path(screenshot, out):
+    """Pre-pipeline path: copy the screenshot, allocate the BGR result."""
+    frame = np.array(screenshot)
+    return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+
+
+def zero_copy_path(screenshot, out):
+    """Current path: wrap the screenshot buffer, convert into out."""
+    return cv2.cvtColor(wrap_screenshot(screenshot), cv2.COLOR_BGRA2BGR, dst=out)
+
+
+def measure(path, shots, out):
+    """Return (bytes allocated per frame, allocations per frame, ms per frame)."""
+    frame_bytes = out.nbytes
+    allocated = 0
+    allocations = 0
+    elapsed = 0.0
+
+    tracemalloc.start()
+    for shot in shots:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        started = time.perf_counter()
+        result = path(shot, out)
+        elapsed += time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        del result
+
+        transient = peak - before
+        allocated += transient
+        # Count frame-sized buffers (anything at least half a BGR frame)
+        allocations += int(round(transient / frame_bytes)) if transient >= frame_bytes // 2 else 0
+    tracemalloc.stop()
+
+    count = len(shots)
+    return allocated / count, allocations / count, elapsed / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args()
+
+    shots = [
+        ScreenShot.from_size(
+            bytearray(np.random.randint(0, 255, args.width * args.height * 4, np.uint8)),
+            args.width,
+            args.height,
+        )
+        for _ in range(4)
+    ]
+    shots = [shots[i % len(shots)] for i in range(args.frames)]
+    out = np.empty((args.height, args.width, 3), dtype=np.uint8)
+
+    print(f"{args.width}x{args.height}, {args.frames} frames")
+    print(f"{'path':<12}{'MB/frame':>12}{'allocs/frame':>15}{'ms/frame':>12}")
+    for name, path in (("legacy", legacy_path), ("zero-copy", zero_copy_path)):
+        allocated, allocations, ms = measure(path, shots, out)
+        print(f"{name:<12}{allocated / 1e6:>12.2f}{allocations:>15.1f}{ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
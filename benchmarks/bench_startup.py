@@ -0,0 +1,67 @@
+"""
+Benchmark: time from launching the GUI to its first shown window.
+
+Starts main.py --startup-time in a fresh process several times and reports
+the in-process time to the first window and the wall-clock time of the
+whole launch (interpreter start and shutdown included). Uses Qt's offscreen
+platform unless QT_QPA_PLATFORM is already set:
+
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+
+
+def launch():
+    """Run the GUI once; return (startup ms, wall-clock ms)."""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, str(MAIN), "--startup-time"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        env=env, text=True, timeout=60
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    for line in result.stdout.splitlines():
+        if line.startswith("startup_ms "):
+            return float(line.split()[1]), wall_ms
+    raise RuntimeError(f"main.py exited with {result.returncode} before showing a window")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="write the measurements to this file")
+    args = parser.parse_args()
+
+    launch()  # Warm the OS file cache
+    samples = [launch() for _ in range(args.runs)]
+
+    print(f"{'':<16}{'median':>10}{'min':>10}{'max':>10}")
+    summary = {}
+    for name, values in (
+        ("first window", [startup for startup, _ in samples]),
+        ("process", [wall for _, wall in samples]),
+    ):
+        summary[name] = {
+            "median_ms": statistics.median(values),
+            "min_ms": min(values),
+            "max_ms": max(values),
+        }
+        print(f"{name + ' (ms)':<16}{statistics.median(values):>10.1f}"
+              f"{min(values):>10.1f}{max(values):>10.1f}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Throughput benchmarks for capture, conversion and encoding.
+
+Drives the ScreenRecorder pipeline with a synthetic screen (no display
+needed) and times VideoEncoder finalization for a matrix of resolutions,
+frame rates and writers. Each configuration runs in its own process so the
+peak RSS figures do not leak into each other.
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --resolutions 2560x1440 --fps 60 --writers ffmpeg
+    python -m benchmarks.run_benchmarks --json results.json
+"""
+import argparse
+import json
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from recorder.screen_recorder import ScreenRecorder
+from recorder.encoder import VideoEncoder
+from recorder.sources import SyntheticSource
+
+WRITERS = ("opencv", "ffmpeg", "ffmpeg-vfr")
+
+
+def run_single(width, height, fps, writer, pattern, duration, max_speed=False):
+    """
+    Record and finalize one configuration; return its measurements.
+
+    By default the synthetic source is paced like a live screen, so the
+    numbers show whether the pipeline keeps up with the target fps. With
+    max_speed it free-runs and capture_fps is the pipeline's throughput.
+    """
+    streaming = writer.startswith("ffmpeg")
+    errors = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        video_path = tmp / ("temp_video.mp4" if streaming else "temp_video.avi")
+        output_path = tmp / "output.mp4"
+
+        recorder = ScreenRecorder(
+            video_path,
+            fps=fps,
+            streaming=streaming,
+            vfr=writer == "ffmpeg-vfr",
+            source=SyntheticSource(width, height, pattern, live=not max_speed),
+        )
+        recorder.error_occurred.connect(errors.append)
+
+        timer = threading.Timer(duration, recorder.stop_recording)
+        started = time.perf_counter()
+        timer.start()
+        recorder.run()  # Runs the capture stage on this thread
+        wall = time.perf_counter() - started
+        # Free-running captures cover more media time than wall time
+        recorded = recorder.duration if not max_speed else wall
+
+        encoder = VideoEncoder(video_path, None, output_path)
+        encoder.encoding_finished.connect(
+            lambda ok, message: None if ok else errors.append(message)
+        )
+        started = time.perf_counter()
+        encoder.run()
+        finalize = time.perf_counter() - started
+
+        stats = recorder.get_stats()
+        size = output_path.stat().st_size if output_path.exists() else 0
+
+    dropped = (
+        stats["capture"]["dropped"] + stats["convert"]["dropped"]
+        + stats["write"]["dropped"]
+    )
+    return {
+        "resolution": f"{width}x{height}",
+        "fps": fps,
+        "writer": writer,
+        "pattern": pattern,
+        "max_speed": max_speed,
+        "duration": recorded,
+        "capture_fps": stats["capture"]["processed"] / recorded,
+        "frames_written": stats["write"]["frames_written"],
+        "expected_frames": stats["write"].get("expected_frames", 0),
+        "dropped": dropped,
+        "duplicated": stats["write"]["duplicated"],
+        "late_slots": stats["capture"]["late_slots"],
+        "latency_ms": {
+            name: stats[name]["latency_ms"] for name in ("capture", "convert", "write")
+        },
+        "finalize_s": finalize,
+        "output_mb": size / 1e6,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "errors": errors,
+    }
+
+
+def run_matrix(args):
+    """Run every configuration in a child process and collect the results."""
+    writers = list(args.writers)
+    if not shutil.which("ffmpeg"):
+        print("FFmpeg not found; benchmarking the OpenCV writer only")
+        writers = [writer for writer in writers if not writer.startswith("ffmpeg")]
+
+    results = []
+    for resolution in args.resolutions:
+        for fps in args.fps:
+            for writer in writers:
+                cmd = [
+                    sys.executable, "-m", "benchmarks.run_benchmarks",
+                    "--single", f"{resolution}:{fps}:{writer}:{args.pattern}",
+                    "--duration", str(args.duration),
+                ]
+                if args.max_speed:
+                    cmd.append("--max-speed")
+                child = subprocess.run(cmd, capture_output=True, text=True)
+                if child.returncode != 0:
+                    print(f"{resolution} {fps}fps {writer}: failed\n{child.stderr}")
+                    continue
+                result = json.loads(child.stdout.strip().splitlines()[-1])
+                results.append(result)
+                print_row(result)
+    return results
+
+
+def print_header():
+    """Print the result table header."""
+    print(
+        f"{'resolution':<11}{'fps':>4} {'writer':<11}{'cap fps':>8}{'frames':>13}"
+        f"{'drop':>6}{'dup':>6}{'cap p95':>9}{'cvt p95':>9}{'wr p95':>9}"
+        f"{'final s':>9}{'rss MB':>8}"
+    )
+
+
+def print_row(result):
+    """Print one result line."""
+    latency = result["latency_ms"]
+    frames = f"{result['frames_written']}/{result['expected_frames']}"
+    print(
+        f"{result['resolution']:<11}{result['fps']:>4} {result['writer']:<11}"
+        f"{result['capture_fps']:>8.1f}{frames:>13}"
+        f"{result['dropped']:>6}{result['duplicated']:>6}"
+        f"{latency['capture']['p95']:>9.2f}{latency['convert']['p95']:>9.2f}"
+        f"{latency['write']['p95']:>9.2f}"
+        f"{result['finalize_s']:>9.2f}{result['peak_rss_mb']:>8.0f}"
+    )
+    for error in result["errors"]:
+        print(f"    error: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen recorder throughput benchmarks")
+    parser.add_argument(
+        "--resolutions", nargs="+", default=["1280x720", "1920x1080", "2560x1440"]
+    )
+    parser.add_argument("--fps", nargs="+", type=int, default=[30, 60])
+    parser.add_argument("--writers", nargs="+", choices=WRITERS, default=list(WRITERS))
+    parser.add_argument("--pattern", choices=SyntheticSource.PATTERNS, default="moving")
+    parser.add_argument(
+        "--max-speed", action="store_true",
+        help="free-run the source instead of pacing it at the target fps"
+    )
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    parser.add_argument("--json", help="write all results to this file")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        resolution, fps, writer, pattern = args.single.split(":")
+        width, height = (int(v) for v in resolution.split("x"))
+        result = run_single(
+            width, height, int(fps), writer, pattern, args.duration, args.max_speed
+        )
+        print(json.dumps(result))
+        return
+
+    print_header()
+    results = run_matrix(args)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
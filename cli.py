@@ -0,0 +1,456 @@
+"""
+Command-line entry point for headless, scripted recordings.
+
+Drives the recording engine directly, without PyQt, so it starts quickly
+and can run timed captures from scripts:
+
+    python cli.py --duration 10 --output demo.mp4
+    python cli.py --duration 30 --region 0,0,1280,720 --fps 60 --audio
+    python cli.py --duration 5 --all-monitors --profile quality -o all.mp4
+    python cli.py --duration 60 --audio --system-audio --separate-tracks
+
+Temporary files are named after the output file, so several captures can
+run side by side. The exit status is 0 on success and 1 on failure.
+
+With CRASH_SAFE_RECORDING the temporary files go to a journaled session
+directory instead; recordings interrupted by a crash are rebuilt with
+
+    python cli.py --recover
+"""
+import argparse
+import shutil
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+
+# The capture modules (cv2, mss, NumPy) are imported in record(), so
+# --help and --recover start without them
+from recorder.encoder import VideoEncoder, ENCODE_PROFILES
+from recorder.encoder_settings import EncoderSettings
+from recorder.metrics import session_metrics, write_sidecar
+from utils.config import (
+    DEFAULT_FPS, DEFAULT_AUDIO_SAMPLE_RATE, DEFAULT_AUDIO_CHANNELS,
+    check_ffmpeg, get_output_path,
+    FRAME_RING_SIZE, FRAME_RING_POLICY,
+    CAPTURE_LAYOUTS, CAPTURE_LAYOUT, CAPTURE_WORKERS,
+    STREAMING_ENCODE, STREAM_PRESET, STREAM_CRF,
+    ENCODER_THREADS, ENCODER_TUNE, ENCODER_BITRATE, ENCODER_GOP,
+    ENCODER_PIX_FMT, ENCODER_NICE, ENCODER_CPU_AFFINITY,
+    SKIP_UNCHANGED_FRAMES, DEFAULT_ENCODE_PROFILE, SEGMENT_WORKERS,
+    AV_SYNC_CORRECTION, AUDIO_FORMATS, AUDIO_FORMAT, AUDIO_OPUS_BITRATE,
+    AUDIO_BLOCKSIZE, AUDIO_LATENCY, AUDIO_RING_SECONDS,
+    AUDIO_SOURCES, AUDIO_LOOPBACK_GAIN,
+    CRASH_SAFE_RECORDING, FRAGMENT_SECONDS, SESSIONS_DIR, get_sessions_dir
+)
+
+
+def parse_region(value):
+    """Parse "x,y,width,height" into a tuple of ints."""
+    try:
+        x, y, width, height = (int(part) for part in value.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Region must be x,y,width,height (got {value!r})"
+        )
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("Region width and height must be positive")
+    return x, y, width, height
+
+
+def parse_audio_device(value):
+    """Parse "DEVICE[=GAIN]" into an audio source dict."""
+    device, _, gain = value.rpartition("=")
+    try:
+        gain = float(gain) if device else 1.0
+    except ValueError:
+        device, gain = "", 1.0
+    device = device or value
+    return {
+        "device": int(device) if device.isdigit() else device,
+        "gain": gain,
+        "name": device,
+    }
+
+
+def build_parser():
+    """Command-line options."""
+    parser = argparse.ArgumentParser(
+        description="Record the screen without the GUI."
+    )
+    parser.add_argument(
+        "-d", "--duration", type=float, default=None,
+        help="seconds to record (default: until Ctrl+C)"
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, default=None,
+        help="output file (default: timestamped file in output/recordings)"
+    )
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS)
+
+    area = parser.add_mutually_exclusive_group()
+    area.add_argument(
+        "--region", type=parse_region, action="append", metavar="X,Y,W,H",
+        help="record a region; repeat to record several into one video"
+    )
+    area.add_argument(
+        "--monitor", type=int, default=1,
+        help="monitor index to record (default: 1, the primary monitor)"
+    )
+    area.add_argument(
+        "--all-monitors", action="store_true",
+        help="record every monitor into one video"
+    )
+    parser.add_argument(
+        "--layout", choices=CAPTURE_LAYOUTS, default=CAPTURE_LAYOUT,
+        help="how several regions are arranged in the video"
+    )
+
+    parser.add_argument("--audio", action="store_true", help="record the microphone")
+    parser.add_argument(
+        "--audio-device", type=parse_audio_device, action="append", default=[],
+        metavar="DEVICE[=GAIN]",
+        help="also record this input (index or name); repeat to mix several"
+    )
+    parser.add_argument(
+        "--system-audio", action="store_true",
+        help="also record what the computer plays (monitor/loopback input)"
+    )
+    parser.add_argument(
+        "--separate-tracks", action="store_true",
+        help="add each audio source as its own track after the mix"
+    )
+    parser.add_argument(
+        "--audio-format", choices=AUDIO_FORMATS, default=AUDIO_FORMAT,
+        help="temporary audio format; flac/opus are encoded while recording"
+    )
+    parser.add_argument(
+        "--profile", choices=sorted(ENCODE_PROFILES), default=DEFAULT_ENCODE_PROFILE,
+        help="encode profile used when saving"
+    )
+    parser.add_argument(
+        "--preset",
+        help="libx264 preset; overrides the profile's when saving "
+             f"(default: the profile's, {STREAM_PRESET} while recording)"
+    )
+    parser.add_argument(
+        "--crf", type=int,
+        help="libx264 CRF; overrides the profile's when saving "
+             f"(default: the profile's, {STREAM_CRF} while recording)"
+    )
+    parser.add_argument(
+        "--no-streaming", action="store_true",
+        help="write with OpenCV and encode after stopping"
+    )
+    parser.add_argument("--vfr", action="store_true", help="variable frame rate")
+    parser.add_argument(
+        "--segment", type=float, default=None, metavar="SECONDS",
+        help="rotate and encode chunks of this length while recording"
+    )
+    parser.add_argument(
+        "--metrics", action="store_true",
+        help="write <output>.metrics.json next to the recording"
+    )
+    parser.add_argument(
+        "--recover", action="store_true",
+        help="rebuild recordings left behind by a crash, then exit"
+    )
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors")
+    return parser
+
+
+def build_source(args):
+    """Frame source for the requested monitors or regions."""
+    from recorder.sources import MssSource, CompositeSource
+
+    if args.region and len(args.region) > 1:
+        return CompositeSource(
+            args.region, args.layout, CAPTURE_WORKERS, canvases=FRAME_RING_SIZE + 2
+        )
+    if args.region:
+        return MssSource(args.region[0])
+    if args.all_monitors:
+        return CompositeSource(
+            None, args.layout, CAPTURE_WORKERS, canvases=FRAME_RING_SIZE + 2
+        )
+    return MssSource(monitor=args.monitor)
+
+
+def audio_sources(args, log):
+    """Devices to record and mix, in order (the first is the sync master)."""
+    sources = list(AUDIO_SOURCES) if args.audio else []
+    sources += args.audio_device
+    if args.system_audio:
+        from recorder.devices import find_loopback
+        device = find_loopback()
+        if device is None:
+            log("No monitor/loopback input found; system audio not recorded")
+        else:
+            sources.append({
+                "device": device, "gain": AUDIO_LOOPBACK_GAIN, "name": "System audio"
+            })
+    return sources
+
+
+def recorded_anything(screen_recorder, audio_recorder):
+    """Whether the recorders wrote any frames or samples."""
+    return bool(screen_recorder.frames_written or (
+        audio_recorder and audio_recorder.frames_written
+    ))
+
+
+def remove_temp_files(paths):
+    """Delete a failed run's temporary files and segment directories."""
+    for path in paths:
+        path = Path(path)
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Cleanup error: {e}", file=sys.stderr)
+
+
+def recover(args):
+    """Rebuild every orphaned session; return the process exit status."""
+    from recorder.session import find_orphaned_sessions, recover_session
+
+    if not check_ffmpeg():
+        print("Error: FFmpeg not found. Please install FFmpeg and add it to PATH.",
+              file=sys.stderr)
+        return 1
+    sessions = find_orphaned_sessions(SESSIONS_DIR)
+    if not sessions and not args.quiet:
+        print("No interrupted recordings found", file=sys.stderr)
+    status = 0
+    for journal in sessions:
+        try:
+            path = recover_session(journal)
+        except (RuntimeError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            status = 1
+            continue
+        if path is not None:
+            print(path)
+        elif not args.quiet:
+            print(f"Discarded {journal.directory.name}: nothing was recorded",
+                  file=sys.stderr)
+    return status
+
+
+def record(args):
+    """Run one recording; return the process exit status."""
+    from recorder.screen_recorder import ScreenRecorder
+    from recorder.sync import audio_sync
+
+    log = (lambda message: None) if args.quiet else (
+        lambda message: print(message, file=sys.stderr)
+    )
+    errors = []
+
+    def on_error(message):
+        errors.append(message)
+        print(f"Error: {message}", file=sys.stderr)
+
+    if not check_ffmpeg():
+        on_error("FFmpeg not found. Please install FFmpeg and add it to PATH.")
+        return 1
+
+    output_path = args.output or get_output_path()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    streaming = STREAMING_ENCODE and not args.no_streaming
+    h264_temp = streaming or bool(args.segment)
+    # Per-run temp files so several captures can run at once
+    video_path = output_path.with_name(
+        output_path.stem + (".part.mp4" if h264_temp else ".part.avi")
+    )
+    audio_path = output_path.with_name(f"{output_path.stem}.part.{args.audio_format}")
+    journal = None
+    if CRASH_SAFE_RECORDING and streaming:
+        # Fragmented MP4 in a journaled directory survives a crash
+        from recorder.session import SessionJournal, STATE_STOPPED
+        journal = SessionJournal.create(
+            get_sessions_dir(), output=str(output_path.resolve()), fps=args.fps
+        )
+        video_path = journal.path("video.mp4")
+        audio_path = journal.path(f"audio.{args.audio_format}")
+
+    # Explicit --preset/--crf win; otherwise the profile picks them when
+    # saving and STREAM_PRESET/STREAM_CRF apply while recording
+    settings = EncoderSettings(
+        preset=args.preset,
+        crf=args.crf,
+        bitrate=ENCODER_BITRATE,
+        tune=ENCODER_TUNE,
+        threads=ENCODER_THREADS,
+        gop=ENCODER_GOP,
+        pix_fmt=ENCODER_PIX_FMT,
+        nice=ENCODER_NICE,
+        cpu_affinity=ENCODER_CPU_AFFINITY
+    )
+
+    # Both recorders time their frames and blocks from this instant
+    epoch = time.monotonic()
+    screen_recorder = ScreenRecorder(
+        video_path, args.fps,
+        ring_size=FRAME_RING_SIZE,
+        overflow_policy=FRAME_RING_POLICY,
+        streaming=streaming,
+        encoder_settings=settings.with_defaults(preset=STREAM_PRESET, crf=STREAM_CRF),
+        skip_unchanged=SKIP_UNCHANGED_FRAMES,
+        vfr=args.vfr,
+        segment_seconds=args.segment,
+        segment_workers=SEGMENT_WORKERS,
+        source=build_source(args),
+        epoch=epoch,
+        fragment_seconds=FRAGMENT_SECONDS if journal else None
+    )
+    screen_recorder.error_occurred.connect(on_error)
+
+    audio_recorder = None
+    sources = audio_sources(args, log)
+    if sources:
+        # Imported lazily: sounddevice needs PortAudio
+        try:
+            from recorder.audio_recorder import AudioRecorder
+        except (ImportError, OSError):
+            log("sounddevice/PortAudio not found; audio not recorded")
+            sources = []
+    if sources:
+        audio_recorder = AudioRecorder(
+            audio_path, DEFAULT_AUDIO_SAMPLE_RATE, DEFAULT_AUDIO_CHANNELS,
+            epoch=epoch,
+            audio_format=args.audio_format,
+            audio_bitrate=AUDIO_OPUS_BITRATE,
+            blocksize=AUDIO_BLOCKSIZE,
+            latency=AUDIO_LATENCY,
+            ring_seconds=AUDIO_RING_SECONDS,
+            sources=sources,
+            separate_tracks=args.separate_tracks
+        )
+        audio_recorder.error_occurred.connect(on_error)
+    if journal:
+        journal.update(
+            video=video_path.name,
+            segments=f"{video_path.stem}_segments" if args.segment else None,
+            audio=audio_path.name if audio_recorder else None,
+            tracks=[[path.name, title] for path, title in audio_recorder.track_paths]
+            if audio_recorder else []
+        )
+
+    # Ctrl+C (or the duration timer) ends the capture gracefully
+    signal.signal(signal.SIGINT, lambda *_: screen_recorder.stop_recording())
+    timer = None
+    if args.duration is not None:
+        timer = threading.Timer(args.duration, screen_recorder.stop_recording)
+
+    log(f"Recording to {output_path}" + (
+        f" for {args.duration:g}s" if args.duration is not None else " (Ctrl+C to stop)"
+    ))
+    if audio_recorder:
+        audio_recorder.start()
+    if timer:
+        timer.start()
+    try:
+        screen_recorder.run()  # Capture stage runs on this thread
+    finally:
+        if timer:
+            timer.cancel()
+        if audio_recorder:
+            audio_recorder.stop_recording()
+            audio_recorder.wait()
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    def failed():
+        """Keep what a crash-safe run recorded for --recover; drop the rest."""
+        if journal and recorded_anything(screen_recorder, audio_recorder):
+            log(f"Temporary files kept in {journal.directory} (python cli.py --recover)")
+        elif journal:
+            journal.discard()
+        else:
+            remove_temp_files([
+                video_path,
+                video_path.with_name(f"{video_path.stem}_segments"),
+                audio_path,
+                *(path for path, _ in (audio_recorder.track_paths if audio_recorder else ()))
+            ])
+        return 1
+
+    if errors:
+        return failed()
+    if audio_recorder:
+        audio = audio_recorder.get_stats()
+        if audio["overruns"] or audio["input_overflows"]:
+            log(
+                f"Audio overruns: {audio['overruns']} "
+                f"({audio['dropped_seconds']:.2f}s replaced by silence), "
+                f"device overflows: {audio['input_overflows']}"
+            )
+
+    sync = audio_sync(screen_recorder, audio_recorder) if AV_SYNC_CORRECTION else None
+    if journal:
+        journal.update(state=STATE_STOPPED, duration=screen_recorder.duration, audio_sync=sync)
+
+    encoder = VideoEncoder(
+        video_path,
+        audio_path if audio_recorder else None,
+        output_path,
+        profile=args.profile,
+        duration=screen_recorder.duration,
+        settings=settings,
+        audio_sync=sync,
+        extra_audio=audio_recorder.track_paths if audio_recorder else None,
+        segments=screen_recorder.segments
+    )
+    result = []
+    encoder.progress_updated.connect(log)
+    encoder.encoding_finished.connect(
+        lambda success, message: result.append((success, message))
+    )
+    encoder.run()
+
+    success, message = result[-1] if result else (False, "Encoding did not finish")
+    if not success:
+        on_error(message)
+        return failed()
+    if journal:
+        journal.discard()
+
+    if args.metrics:
+        path = write_sidecar(
+            output_path, session_metrics(screen_recorder, audio_recorder, encoder)
+        )
+        log(f"Metrics written to {path}")
+    log(message)
+    print(output_path)
+    return 0
+
+
+def check_args(parser, args):
+    """Reject option values and combinations that cannot work."""
+    if args.fps <= 0:
+        parser.error("--fps must be positive")
+    if args.duration is not None and args.duration <= 0:
+        parser.error("--duration must be positive")
+    if args.segment is not None and args.segment <= 0:
+        parser.error("--segment must be positive")
+    if args.vfr and (args.no_streaming or not STREAMING_ENCODE):
+        parser.error("--vfr needs the streaming encoder (not --no-streaming)")
+    if args.vfr and args.segment:
+        parser.error("--vfr cannot be combined with --segment")
+
+
+def main(argv=None):
+    """Parse arguments and record (or recover)."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_args(parser, args)
+    if args.recover:
+        return recover(args)
+    return record(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,40 @@
 """
 Main entry point for Screen Recorder application.
+
+Pass --startup-time to print the time to the first shown window and exit
+(see benchmarks/bench_startup.py).
 """
+import time
+
+STARTED = time.perf_counter()  # Taken before the heavy imports
+
 import sys
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
 from ui.main_window import MainWindow
 
 
+def report_startup_time(app):
+    """Print milliseconds from launch to the first window, then quit."""
+    print(f"startup_ms {(time.perf_counter() - STARTED) * 1000:.1f}", flush=True)
+    app.quit()
+
+
 def main():
     """Main function to run the application."""
     app = QApplication(sys.argv)
-    
+
     # Set application style
     app.setStyle("Fusion")
-    
+
     # Create and show main window
     window = MainWindow()
     window.show()
-    
+
+    if "--startup-time" in sys.argv:
+        # Runs once the event loop has shown the window
+        QTimer.singleShot(0, lambda: report_startup_time(app))
+
     # Run application
     sys.exit(app.exec_())
 
@@ -0,0 +1,261 @@
+"""
+Audio recording module using sounddevice.
+
+Blocks are streamed to the WAV file as they arrive, so memory use does not
+grow with the recording length and stopping does not have to flush a large
+buffer. With audio_format "flac" or "opus" they are piped into an FFmpeg
+encoder instead (see recorder/ffmpeg_audio_writer.py). In replay mode the
+last replay_seconds are also kept in an AudioRing (output_path may then be
+None to skip the file).
+
+The sound card callback runs on a real-time thread, so it only copies each
+block into a preallocated SampleRing (recorder/pipeline.py): no allocation,
+no lock and no queue. The recorder thread drains the ring every few
+milliseconds. Blocks that find the ring full are counted as overruns and
+replaced by silence of the same length.
+
+Several devices (e.g. the microphone and a system audio loopback) can be
+recorded at once: each gets its own stream and ring, and the recorder
+thread mixes them (see recorder/mixer.py). With separate_tracks every
+source is also written to its own file, which the encoder adds to the
+output as extra audio tracks.
+
+Every block's capture time is recorded on the monotonic clock the screen
+recorder uses (see recorder/sync.py), so the encoder can line the audio up
+with the video and correct for sound card clock drift.
+"""
+import contextlib
+import time
+
+import sounddevice as sd
+from pathlib import Path
+
+from recorder.core import Signal, Worker
+from recorder.mixer import AudioInput, AudioMixer
+from recorder.wav_writer import WavStreamWriter
+from recorder.ffmpeg_audio_writer import FFmpegAudioWriter
+from recorder.replay import AudioRing
+
+
+class AudioRecorder(Worker):
+    """Audio recorder that runs in a separate thread."""
+    
+    STATS_INTERVAL = 1.0  # seconds
+    POLL_INTERVAL = 0.01  # Seconds between ring drains when it is empty
+    
+    def __init__(self, output_path, sample_rate=44100, channels=2, replay_seconds=None,
+                 epoch=None, audio_format="wav", audio_bitrate="128k",
+                 blocksize=0, latency=None, ring_seconds=2.0,
+                 sources=None, separate_tracks=False):
+        super().__init__()
+        self.error_occurred = Signal()  # (message)
+        self.stats_updated = Signal()  # (stats dict) overruns and ring fill
+        self.output_path = output_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.audio_format = audio_format  # wav, flac or opus
+        self.audio_bitrate = audio_bitrate  # Opus only
+        self.blocksize = blocksize  # Frames per callback; 0 lets PortAudio choose
+        self.latency = latency  # "low", "high", seconds, or None for the default
+        self.replay = AudioRing(
+            sample_rate, channels, replay_seconds
+        ) if replay_seconds else None
+        self.epoch = epoch  # Shared session start on the monotonic clock
+        
+        # One input per {"device", "gain", "name"} dict; the first is the
+        # master the mix and the A/V sync follow
+        self.inputs = [
+            AudioInput(
+                sample_rate=sample_rate,
+                channels=channels,
+                blocksize=blocksize,
+                latency=latency,
+                ring_seconds=ring_seconds,
+                **source
+            )
+            for source in (sources or [{}])
+        ]
+        self.mixer = AudioMixer(self.inputs, sample_rate, channels)
+        self.clock = self.inputs[0].clock
+        self.ring = self.inputs[0].ring
+        # (path, title) of each source's own file, muxed as extra tracks
+        self.track_paths = [
+            (self._track_path(i), source.name) for i, source in enumerate(self.inputs)
+        ] if separate_tracks and output_path is not None and len(self.inputs) > 1 else []
+        self._is_recording = False
+        self.frames_written = 0
+    
+    def _track_path(self, index):
+        """<stem>.track<n><suffix> next to the mixed file."""
+        path = Path(self.output_path)
+        return path.with_name(f"{path.stem}.track{index + 1}{path.suffix}")
+    
+    @property
+    def blocks_received(self):
+        """Blocks delivered by all devices."""
+        return sum(source.blocks_received for source in self.inputs)
+    
+    @property
+    def input_overflows(self):
+        """Callbacks in which a device reported lost input samples."""
+        return sum(source.input_overflows for source in self.inputs)
+    
+    @property
+    def input_underflows(self):
+        """Callbacks in which a device reported an input underflow."""
+        return sum(source.input_underflows for source in self.inputs)
+    
+    def run(self):
+        """Start audio recording."""
+        self._is_recording = True
+        writer = None
+        track_writers = []
+        
+        try:
+            if self.output_path is not None:
+                writer = self._open_writer(self.output_path)
+            track_writers = [self._open_writer(path) for path, _ in self.track_paths]
+            
+            last_stats = time.monotonic()
+            
+            # Start one stream per device
+            with contextlib.ExitStack() as streams:
+                for source in self.inputs:
+                    streams.enter_context(source.open())
+                self.ring = self.inputs[0].ring  # Reallocated if the format changed
+                self.mixer.prepare()
+                for source in self.inputs:
+                    source.active = True
+                
+                # Stream audio data to disk
+                while self._is_recording:
+                    if not self._drain(writer, track_writers):
+                        time.sleep(self.POLL_INTERVAL)
+                    
+                    now = time.monotonic()
+                    if now - last_stats >= self.STATS_INTERVAL:
+                        self.stats_updated.emit(self.get_stats())
+                        last_stats = now
+                
+                for source in self.inputs:
+                    source.active = False
+            
+            # Write whatever arrived before the streams closed
+            for source in self.inputs:
+                source.ring.flush()
+            while self._drain(writer, track_writers):
+                pass
+        
+        except Exception as e:
+            self.error_occurred.emit(f"Audio recording error: {str(e)}")
+        
+        finally:
+            for source in self.inputs:
+                source.active = False
+            self.stats_updated.emit(self.get_stats())
+            for track in track_writers:
+                self._close_writer(track)
+            if writer:
+                self._close_writer(writer)
+                self.frames_written = writer.frames_written
+    
+    def _drain(self, writer, track_writers):
+        """Mix and store one chunk; return False when there was nothing."""
+        block, tracks = self.mixer.mix(tracks=bool(track_writers))
+        if not len(block):
+            return False
+        self._store(writer, block)
+        for track, samples in zip(track_writers, tracks):
+            track.write(samples)
+        return True
+    
+    def _close_writer(self, writer):
+        """Finish a file, reporting FFmpeg failures."""
+        if writer.close() is False:
+            self.error_occurred.emit(
+                f"FFmpeg failed to finalize audio: {writer.error_output()}"
+            )
+        # Match the old behaviour of not leaving an empty audio file
+        if writer.frames_written == 0:
+            Path(writer.path).unlink(missing_ok=True)
+    
+    def _open_writer(self, path):
+        """WAV file writer, or an FFmpeg encoder for flac/opus."""
+        if self.audio_format == "wav":
+            return WavStreamWriter(path, self.sample_rate, self.channels)
+        return FFmpegAudioWriter(
+            path,
+            self.sample_rate,
+            self.channels,
+            self.audio_format,
+            self.audio_bitrate
+        )
+    
+    def _store(self, writer, block):
+        """Send a block to the WAV file and/or the replay ring."""
+        if writer:
+            writer.write(block)
+        if self.replay is not None:
+            # The chunk buffer is reused, the replay ring keeps its blocks
+            self.replay.append(block.copy())
+    
+    def get_stats(self):
+        """
+        Return overrun counters and ring fill.
+        
+        input_overflows are samples the device itself lost (the callback
+        ran late); ring overruns are blocks dropped because the writer
+        thread fell behind. Counters are summed over all devices, ring fill
+        is the master's; "sources" has the figures of each device.
+        """
+        stats = self.ring.snapshot()
+        stats["overruns"] = sum(source.ring.overruns for source in self.inputs)
+        stats["dropped_frames"] = sum(source.ring.dropped_frames for source in self.inputs)
+        stats["input_overflows"] = self.input_overflows
+        stats["input_underflows"] = self.input_underflows
+        stats["dropped_seconds"] = sum(
+            source.ring.dropped_frames / source.sample_rate for source in self.inputs
+        )
+        if len(self.inputs) > 1:
+            stats["sources"] = self.mixer.snapshot()
+        return stats
+    
+    def metrics(self):
+        """Session telemetry: block counts, overruns, ring fill and sources."""
+        return {
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "blocksize": self.blocksize,
+            "blocks_received": self.blocks_received,
+            "frames_written": self.frames_written,
+            "input_overflows": self.input_overflows,
+            "input_underflows": self.input_underflows,
+            "ring": self.ring.snapshot(),
+            "clock": self.clock.snapshot(self.epoch),
+            "sources": self.mixer.snapshot(),
+            "separate_tracks": len(self.track_paths),
+        }
+    
+    def stop_recording(self):
+        """Stop audio recording."""
+        self._is_recording = False
+    
+    @staticmethod
+    def check_microphone():
+        """Check if microphone is available."""
+        try:
+            devices = sd.query_devices()
+            for device in devices:
+                if device['max_input_channels'] > 0:
+                    return True
+            return False
+        except Exception:
+            return False
+    
+    @staticmethod
+    def get_default_device():
+        """Get default input device info."""
+        try:
+            return sd.query_devices(kind='input')
+        except Exception:
+            return None
@@ -0,0 +1,76 @@
+"""
+Pure-Python threading primitives for the recording engine.
+
+The recorder classes run on plain threads and report through Signal
+callback lists, so they can be embedded in services and scripts without
+PyQt. Callbacks run synchronously on the emitting thread; the GUI wraps
+the engine in thin Qt adapters (ui/adapters.py) that forward emissions to
+its own thread.
+"""
+import threading
+
+
+class Signal:
+    """Thread-safe list of callbacks, connected and emitted like a Qt signal."""
+
+    def __init__(self):
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def connect(self, callback):
+        """Call callback(*args) on every emit."""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def disconnect(self, callback=None):
+        """Remove one callback, or all of them."""
+        with self._lock:
+            if callback is None:
+                self._callbacks.clear()
+            else:
+                self._callbacks.remove(callback)
+
+    def receivers(self):
+        """Number of connected callbacks."""
+        return len(self._callbacks)
+
+    def emit(self, *args):
+        """Call every connected callback on the current thread."""
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback(*args)
+
+
+class Worker:
+    """
+    Base class for objects whose run() executes on their own thread.
+
+    Mirrors the QThread calls the recorders used (start, isRunning, wait),
+    so run() can still be called directly to use the current thread.
+    """
+
+    def __init__(self):
+        self._thread = None
+
+    def run(self):
+        raise NotImplementedError
+
+    def start(self):
+        """Run run() on a new daemon thread."""
+        self._thread = threading.Thread(
+            target=self.run, name=type(self).__name__, daemon=True
+        )
+        self._thread.start()
+
+    def isRunning(self):
+        """Whether the worker thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        """Join the worker thread; return True once it has finished."""
+        if self._thread is None:
+            return True
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        return not self._thread.is_alive()
@@ -0,0 +1,63 @@
+"""
+Change detection for skipping unchanged frames.
+
+Static screens (IDEs, slides) produce long runs of identical frames. A cheap
+downsampled diff rejects most changed frames early; frames that pass it are
+confirmed identical with an exact band-by-band comparison, so small changes
+such as a blinking text cursor are never missed.
+"""
+import time
+
+import numpy as np
+
+
+class ChangeDetector:
+    """Decide whether a frame differs from the previous one."""
+
+    def __init__(self, step=8, band_rows=32):
+        self.step = step  # Sampling stride of the coarse diff
+        self.band_rows = band_rows  # Rows per exact comparison band
+        self.checked = 0
+        self.unchanged = 0
+        self.compare_time = 0.0  # Seconds spent comparing frames
+
+    def is_unchanged(self, frame, previous):
+        """Return True if frame is identical to previous."""
+        started = time.perf_counter()
+        same = self._equal(frame, previous)
+        self.compare_time += time.perf_counter() - started
+
+        self.checked += 1
+        if same:
+            self.unchanged += 1
+        return same
+
+    def _equal(self, frame, previous):
+        """Coarse downsampled check, then exact banded comparison."""
+        if previous is None or frame.shape != previous.shape:
+            return False
+
+        step = self.step
+        if not np.array_equal(frame[::step, ::step], previous[::step, ::step]):
+            return False
+
+        # Exact check, bailing out at the first differing band
+        frame, previous = _as_words(frame), _as_words(previous)
+        for y in range(0, frame.shape[0], self.band_rows):
+            band = slice(y, y + self.band_rows)
+            if not np.array_equal(frame[band], previous[band]):
+                return False
+        return True
+
+    @property
+    def skip_ratio(self):
+        """Fraction of checked frames that were unchanged."""
+        return self.unchanged / self.checked if self.checked else 0.0
+
+
+def _as_words(frame):
+    """View a frame's rows as uint64 words, which compare ~2x faster."""
+    row_bytes = frame.nbytes // frame.shape[0]
+    if frame.flags.c_contiguous and row_bytes % 8 == 0:
+        return frame.reshape(frame.shape[0], -1).view(np.uint64)
+    return frame
@@ -0,0 +1,65 @@
+"""
+Background probing of external tools and capture devices.
+
+Looking for FFmpeg starts a subprocess and listing audio devices loads
+PortAudio, so neither should run on the GUI thread at startup. Both are
+probed once, on a DeviceProbe worker, and the results are cached for the
+rest of the session.
+"""
+import threading
+
+from recorder.core import Signal, Worker
+from utils.config import AUDIO_LOOPBACK_DEVICE, check_ffmpeg
+
+_results = {}
+_lock = threading.Lock()
+
+
+def check_microphone():
+    """Whether an input device exists (False if sounddevice cannot load)."""
+    try:
+        from recorder.audio_recorder import AudioRecorder
+    except (ImportError, OSError):
+        return False  # sounddevice or PortAudio missing
+    return AudioRecorder.check_microphone()
+
+
+def find_loopback(device=AUDIO_LOOPBACK_DEVICE):
+    """
+    Input device that records system audio, or None.
+
+    "auto" looks for a monitor/loopback input by name; any other value is
+    taken as the device to use.
+    """
+    if device != "auto":
+        return device
+    try:
+        from recorder.mixer import find_loopback_device
+    except (ImportError, OSError):
+        return None
+    return find_loopback_device()
+
+
+def probe_devices(refresh=False):
+    """
+    Return {"ffmpeg": bool, "microphone": bool, "loopback": device or
+    None}, probing only once.
+    """
+    with _lock:
+        if refresh or not _results:
+            _results["ffmpeg"] = check_ffmpeg()
+            _results["microphone"] = check_microphone()
+            _results["loopback"] = find_loopback() if _results["microphone"] else None
+        return dict(_results)
+
+
+class DeviceProbe(Worker):
+    """Run probe_devices() on a background thread."""
+
+    def __init__(self, refresh=False):
+        super().__init__()
+        self.probed = Signal()  # (results dict)
+        self.refresh = refresh
+
+    def run(self):
+        self.probed.emit(probe_devices(self.refresh))
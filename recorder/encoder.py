@@ -1,26 +1,103 @@
 """
 Video encoder module for muxing video and audio with FFmpeg.
+
+The input is probed first: streams the output container can hold as they
+are (e.g. H.264 from the streaming writer) are stream-copied, so
+finalizing takes seconds instead of a full re-encode.
+
+FFmpeg reports progress as key=value blocks on stdout (-progress pipe:1),
+which are parsed as they arrive to publish frames, fps, speed, percent
+complete and an ETA. The encode can be cancelled at any time.
+
+Given audio_sync (see recorder/sync.py), the audio is shifted by its start
+offset from the video and resampled from the rate the sound card really
+ran at, so long recordings stay in sync.
+
+segments is the SegmentedWriter of a segmented recording: its last chunk
+is encoded and the chunks joined into video_path first, on the encoder's
+thread, so stopping the recorder never waits for it.
+
+extra_audio adds the separately recorded sources of a multi-device
+recording as further audio tracks after the mix, each with its own title,
+so they can be balanced again in an editor.
 """
 import subprocess
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from PyQt5.QtCore import QThread, pyqtSignal
+
+from recorder.core import Signal, Worker
+from recorder.probe import probe_media
+from recorder.encoder_settings import EncoderSettings
+
+# copy: stream-copy any video the container accepts, else re-encode
+# fast: stream-copy H.264 (the streaming writer's output), else veryfast
+# quality: always re-encode with the slower medium preset and a lower CRF
+# The values are defaults for options the EncoderSettings passed in leave
+# as None
+ENCODE_PROFILES = {
+    "copy": {},
+    "fast": {"preset": "veryfast", "crf": 23},
+    "quality": {"preset": "medium", "crf": 20},
+}
+
+# Codecs each output container can take without re-encoding
+VIDEO_COPY_CODECS = {
+    ".mp4": ("h264", "hevc", "mpeg4", "av1"),
+    ".mov": ("h264", "hevc", "mpeg4"),
+    ".mkv": ("h264", "hevc", "mpeg4", "av1", "vp9"),
+    ".avi": ("h264", "mpeg4", "mjpeg"),
+}
+AUDIO_COPY_CODECS = {
+    ".mp4": ("aac", "mp3", "opus", "flac"),
+    ".mov": ("aac", "mp3", "pcm_s16le"),
+    ".mkv": ("aac", "mp3", "opus", "flac", "pcm_s16le"),
+    ".avi": ("mp3", "pcm_s16le"),
+}
 
 
-class VideoEncoder(QThread):
+class VideoEncoder(Worker):
     """Video encoder that muxes video and audio."""
-    
-    progress_updated = pyqtSignal(str)
-    encoding_finished = pyqtSignal(bool, str)  # success, message
-    
-    def __init__(self, video_path, audio_path, output_path):
+
+    def __init__(self, video_path, audio_path, output_path, profile="fast",
+                 duration=None, settings=None, audio_sync=None, extra_audio=None,
+                 segments=None):
         super().__init__()
+        self.progress_updated = Signal()  # (status text)
+        self.progress_stats = Signal()  # (dict: frames, fps, speed, percent, eta)
+        self.encoding_finished = Signal()  # (success, message)
         self.video_path = Path(video_path)
-        self.audio_path = Path(audio_path)
+        self.audio_path = Path(audio_path) if audio_path else None
         self.output_path = Path(output_path)
-    
+        if profile not in ENCODE_PROFILES:
+            raise ValueError(f"Unknown encode profile: {profile}")
+        self.profile = profile
+        # The profile only fills in what the caller's settings leave unset
+        self.settings = (settings or EncoderSettings()).with_defaults(
+            **ENCODE_PROFILES[profile]
+        )
+        self.duration = duration  # Seconds of media; probed if None
+        self.audio_sync = audio_sync  # {"offset", "rate", "nominal_rate"} or None
+        # (path, title) of each extra track, on the same timeline as audio_path
+        self.extra_audio = [(Path(path), title) for path, title in extra_audio or ()]
+        self.segments = segments  # SegmentedWriter to finish into video_path
+        self.sync_applied = {}  # Corrections used by the last run
+        self.copied_video = False  # Whether the last run stream-copied video
+        self.encode_time = 0.0  # Wall-clock seconds FFmpeg ran
+        self.last_progress = {}  # Latest parsed progress block
+        self.stage = "Encoding video"
+        self._process = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+        self._stderr_tail = deque(maxlen=50)
+
     def run(self):
         """Mux video and audio using FFmpeg."""
         try:
+            if self.segments is not None and not self._finish_segments():
+                return
+
             # Check if files exist
             if not self.video_path.exists():
                 self.encoding_finished.emit(
@@ -28,64 +105,94 @@ class VideoEncoder(QThread):
                     f"Video file not found: {self.video_path}"
                 )
                 return
-            
+
             # Check if audio exists
-            has_audio = self.audio_path.exists()
-            
+            has_audio = self.audio_path is not None and self.audio_path.exists()
+
+            video_info = probe_media(self.video_path)
+            if self.duration is None:
+                self.duration = video_info["duration"]
+            video_args = self._video_args(video_info["video_codec"])
+            self.copied_video = video_args == ["-c:v", "copy"]
+
             if has_audio:
                 # Mux video and audio
-                self.progress_updated.emit("Muxing video and audio...")
-                cmd = [
-                    "ffmpeg",
+                self.stage = "Muxing video and audio"
+                audio_args = self._audio_args(
+                    probe_media(self.audio_path)["audio_codec"]
+                )
+                sync_input, sync_filter = self._audio_sync_args(
+                    copy=audio_args == ["-c:a", "copy"]
+                )
+                inputs = [
                     "-i", str(self.video_path),
-                    "-i", str(self.audio_path),
-                    "-c:v", "libx264",
-                    "-preset", "medium",
-                    "-crf", "23",
-                    "-c:a", "aac",
-                    "-b:a", "192k",
-                    "-y",  # Overwrite output file
-                    str(self.output_path)
+                    *sync_input, "-i", str(self.audio_path)
                 ]
+                tracks = [(path, title) for path, title in self.extra_audio if path.exists()]
+                for path, _ in tracks:
+                    # Recorded alongside the mix, so shifted the same way
+                    inputs += [*sync_input, "-i", str(path)]
+                audio_args = self._track_args(tracks) + sync_filter + audio_args
             else:
                 # Only video, no audio
-                self.progress_updated.emit("Encoding video...")
-                cmd = [
-                    "ffmpeg",
-                    "-i", str(self.video_path),
-                    "-c:v", "libx264",
-                    "-preset", "medium",
-                    "-crf", "23",
-                    "-y",
-                    str(self.output_path)
-                ]
-            
+                self.stage = "Finalizing video" if self.copied_video else "Encoding video"
+                inputs = ["-i", str(self.video_path)]
+                audio_args = []
+            self.progress_updated.emit(f"{self.stage}...")
+
+            cmd = [
+                "ffmpeg",
+                "-loglevel", "error",
+                "-nostats",
+                "-progress", "pipe:1",
+                *inputs,
+                *video_args,
+                *audio_args,
+                "-y",  # Overwrite output file
+                str(self.output_path)
+            ]
+
             # Run FFmpeg
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            
-            # Wait for completion
-            stdout, stderr = process.communicate()
-            
-            if process.returncode == 0:
+            with self._lock:
+                if self._cancelled:
+                    self._finish_cancelled()
+                    return
+                self._process = subprocess.Popen(
+                    cmd,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    universal_newlines=True
+                )
+                self.settings.apply(self._process)
+
+            # Drain stderr so FFmpeg never blocks on a full pipe
+            stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+            stderr_thread.start()
+
+            started = time.monotonic()
+            self._read_progress()
+            returncode = self._process.wait()
+            self.encode_time = time.monotonic() - started
+            stderr_thread.join(timeout=1.0)
+
+            if self._cancelled:
+                self._finish_cancelled()
+            elif returncode == 0:
                 self.progress_updated.emit("Encoding complete!")
                 self.encoding_finished.emit(
                     True,
                     f"Recording saved to: {self.output_path}"
                 )
-                
+
                 # Clean up temporary files
                 self._cleanup_temp_files()
             else:
                 self.encoding_finished.emit(
                     False,
-                    f"FFmpeg error: {stderr}"
+                    f"FFmpeg error: {self.error_output()}"
                 )
-        
+
         except FileNotFoundError:
             self.encoding_finished.emit(
                 False,
@@ -96,13 +203,244 @@ class VideoEncoder(QThread):
                 False,
                 f"Encoding error: {str(e)}"
             )
-    
+        finally:
+            self._process = None
+
+    def _video_args(self, codec):
+        """Stream-copy when the profile and container allow it."""
+        container = self.output_path.suffix.lower()
+        if self.profile == "copy":
+            copyable = VIDEO_COPY_CODECS.get(container, ())
+        elif self.profile == "fast":
+            # The streaming writer's H.264 is good enough to keep as it is
+            copyable = ("h264",) if "h264" in VIDEO_COPY_CODECS.get(container, ()) else ()
+        else:
+            copyable = ()  # quality: re-encode with the slower preset
+        if codec in copyable:
+            return ["-c:v", "copy"]
+
+        return self.settings.codec_args()
+
+    def _audio_args(self, codec):
+        """Stream-copy audio the container accepts, otherwise AAC."""
+        container = self.output_path.suffix.lower()
+        # Drift correction resamples, which needs a re-encode
+        if codec in AUDIO_COPY_CODECS.get(container, ()) and self._drift_rate() is None:
+            return ["-c:a", "copy"]
+        return ["-c:a", "aac", "-b:a", "192k"]
+
+    def _track_args(self, tracks):
+        """Map the mix and each extra track, titled, into the output."""
+        if not tracks:
+            return []
+        args = ["-map", "0:v:0"]
+        for index, title in enumerate(["Mix"] + [title for _, title in tracks]):
+            # MKV shows the title, MP4/MOV players the handler name
+            args += [
+                "-map", f"{index + 1}:a:0",
+                f"-metadata:s:a:{index}", f"title={title}",
+                f"-metadata:s:a:{index}", f"handler_name={title}"
+            ]
+        return args
+
+    def _drift_rate(self):
+        """Measured device rate to correct for, or None if it matches the file."""
+        sync = self.audio_sync
+        if not sync or round(sync["rate"]) == sync["nominal_rate"]:
+            return None
+        return round(sync["rate"])
+
+    def _audio_sync_args(self, copy):
+        """
+        Options that line the audio up with the video.
+
+        Returns (audio input options, output filter options). A late start
+        is delayed with -itsoffset and the gap filled with silence, an
+        early one trimmed with -ss; drift is corrected by relabelling the
+        samples with the measured rate and resampling to the nominal one.
+        Stream-copied audio can only be shifted.
+        """
+        self.sync_applied = {}
+        sync = self.audio_sync
+        if not sync:
+            return [], []
+
+        offset = round(sync["offset"], 4)
+        if offset > 0:
+            input_args = ["-itsoffset", str(offset)]
+        elif offset < 0:
+            input_args = ["-ss", str(-offset)]
+        else:
+            input_args = []
+        self.sync_applied["offset"] = offset
+        if copy:
+            return input_args, []
+
+        filters = []
+        rate = self._drift_rate()
+        nominal = sync["nominal_rate"]
+        if rate is not None:
+            # Back at the recorded rate first; Opus always decodes at 48 kHz
+            filters += [f"aresample={nominal}", f"asetrate={rate}"]
+            self.sync_applied["rate"] = rate
+        # Pad the delayed start and any gaps with silence
+        filters.append(f"aresample={nominal}:async=1:first_pts=0")
+        return input_args, ["-af", ",".join(filters)]
+
+    def metrics(self):
+        """Session telemetry for the final encode."""
+        progress = self.last_progress
+        return {
+            "profile": self.profile,
+            "copied_video": self.copied_video,
+            "media_duration": self.duration,
+            "encode_time": self.encode_time,
+            "speed": progress.get("speed"),
+            "fps": progress.get("fps"),
+            "frames": progress.get("frames"),
+            "cancelled": self._cancelled,
+            "audio_sync": self.sync_applied,
+            "extra_audio_tracks": len(self.extra_audio),
+        }
+
+    def _finish_segments(self):
+        """Encode the last chunk and join the chunks; False if run() must stop."""
+        self.stage = "Encoding last segment"
+        while self.segments.pending and not self._cancelled:
+            self.progress_updated.emit(
+                f"{self.stage}... ({self.segments.pending} pending)"
+            )
+            time.sleep(0.2)
+        if self._cancelled:
+            # The chunks are kept; encodes already running just complete
+            self._finish_cancelled()
+            return False
+        self.stage = "Joining segments"
+        self.progress_updated.emit(f"{self.stage}...")
+        if not self.segments.finish():
+            self.encoding_finished.emit(
+                False, f"Finishing segments failed: {self.segments.error_output()}"
+            )
+            return False
+        return True
+
+    def cancel(self):
+        """Kill FFmpeg; run() then removes the partial output."""
+        with self._lock:
+            self._cancelled = True
+            if self._process and self._process.poll() is None:
+                self._process.kill()
+
+    @property
+    def cancelled(self):
+        """Whether cancel() was called."""
+        return self._cancelled
+
+    def _read_progress(self):
+        """Parse -progress blocks from FFmpeg's stdout as they arrive."""
+        block = {}
+        for line in self._process.stdout:
+            key, _, value = line.strip().partition("=")
+            if not key:
+                continue
+            block[key] = value
+            # Each block ends with progress=continue or progress=end
+            if key == "progress":
+                self._emit_progress(block)
+                block = {}
+
+    def _emit_progress(self, block):
+        """Publish one progress block as stats and a status line."""
+        stats = parse_progress(block, self.duration)
+        self.last_progress = stats
+        self.progress_stats.emit(stats)
+        self.progress_updated.emit(f"{self.stage}... {format_progress(stats)}")
+
+    def _drain_stderr(self):
+        """Keep the last FFmpeg log lines for error reporting."""
+        for line in self._process.stderr:
+            self._stderr_tail.append(line.rstrip())
+
+    def error_output(self):
+        """Return the tail of FFmpeg's log output."""
+        return "\n".join(self._stderr_tail)
+
+    def _finish_cancelled(self):
+        """Remove the partial output and report the cancellation."""
+        try:
+            if self.output_path.exists():
+                self.output_path.unlink()
+        except OSError as e:
+            print(f"Cleanup error: {e}")
+        self.progress_updated.emit("Encoding cancelled")
+        self.encoding_finished.emit(False, "Encoding cancelled.")
+
     def _cleanup_temp_files(self):
         """Remove temporary video and audio files."""
         try:
             if self.video_path.exists():
                 self.video_path.unlink()
-            if self.audio_path.exists():
+            if self.audio_path and self.audio_path.exists():
                 self.audio_path.unlink()
+            for path, _ in self.extra_audio:
+                path.unlink(missing_ok=True)
         except Exception as e:
             print(f"Cleanup error: {e}")
+
+
+def parse_progress(block, duration=None):
+    """
+    Convert an FFmpeg -progress block into numbers.
+
+    Returns frames, fps, speed, position (seconds), and when the duration
+    is known, percent (0-100) and eta (seconds); unknown values are None.
+    """
+    def number(key):
+        try:
+            return float(block.get(key, ""))
+        except ValueError:
+            return None  # FFmpeg reports "N/A" before it has a value
+
+    frames = number("frame")
+    # out_time_us is the current output position (out_time_ms is also in us)
+    position = number("out_time_us")
+    if position is None:
+        position = number("out_time_ms")
+    position = max(position / 1e6, 0.0) if position is not None else None
+    speed = block.get("speed", "").rstrip("x")
+    try:
+        speed = float(speed)
+    except ValueError:
+        speed = None
+
+    stats = {
+        "frames": int(frames) if frames is not None else None,
+        "fps": number("fps"),
+        "speed": speed,
+        "position": position,
+        "percent": None,
+        "eta": None,
+        "done": block.get("progress") == "end",
+    }
+    if duration and position is not None:
+        stats["percent"] = 100.0 if stats["done"] else min(position / duration * 100, 100.0)
+        if speed:
+            stats["eta"] = max(duration - position, 0.0) / speed
+    return stats
+
+
+def format_progress(stats):
+    """Human readable progress line."""
+    parts = []
+    if stats["percent"] is not None:
+        parts.append(f"{stats['percent']:.0f}%")
+    if stats["frames"] is not None:
+        parts.append(f"{stats['frames']} frames")
+    if stats["fps"]:
+        parts.append(f"{stats['fps']:.0f} fps")
+    if stats["speed"]:
+        parts.append(f"{stats['speed']:.1f}x")
+    if stats["eta"] is not None and not stats["done"]:
+        minutes, seconds = divmod(int(stats["eta"] + 0.5), 60)
+        parts.append(f"ETA {minutes}:{seconds:02d}")
+    return " | ".join(parts)
@@ -0,0 +1,108 @@
+"""
+Encoder configuration shared by every FFmpeg H.264 encode.
+
+EncoderSettings collects the libx264 options (preset, tune, CRF or bitrate,
+GOP size, pixel format, thread count) and how the FFmpeg process should be
+scheduled. A positive nice value and/or a CPU affinity set keep encoding
+from starving the capture thread on busy machines.
+"""
+import os
+import subprocess
+
+
+class EncoderSettings:
+    """
+    libx264 options and FFmpeg process scheduling.
+
+    preset and crf may be left as None: with_defaults() fills them in (the
+    encode profiles do this), and codec_args() falls back to DEFAULT_PRESET
+    and DEFAULT_CRF.
+    """
+
+    DEFAULT_PRESET = "veryfast"
+    DEFAULT_CRF = 23
+
+    def __init__(self, preset=None, crf=None, bitrate=None, tune=None,
+                 threads=0, gop=None, pix_fmt="yuv420p", nice=None,
+                 cpu_affinity=None):
+        self.preset = preset  # None: profile or DEFAULT_PRESET
+        self.crf = crf  # None: profile or DEFAULT_CRF
+        self.bitrate = bitrate  # e.g. "8M"; replaces CRF when set
+        self.tune = tune  # e.g. "zerolatency" or "stillimage"
+        self.threads = threads  # 0 lets x264 pick
+        self.gop = gop  # Keyframe interval in frames; None keeps the default
+        self.pix_fmt = pix_fmt
+        self.nice = nice  # Niceness increment for the FFmpeg process
+        self.cpu_affinity = cpu_affinity  # CPU indices FFmpeg may run on
+
+    def replace(self, **changes):
+        """Return a copy with some options changed."""
+        options = dict(self.__dict__)
+        options.update(changes)
+        return EncoderSettings(**options)
+
+    def with_defaults(self, **defaults):
+        """Return a copy with the options left as None taken from defaults."""
+        return self.replace(**{
+            name: value for name, value in defaults.items()
+            if getattr(self, name) is None
+        })
+
+    def codec_args(self):
+        """FFmpeg output arguments for libx264."""
+        args = ["-c:v", "libx264", "-preset", self.preset or self.DEFAULT_PRESET]
+        if self.tune:
+            args += ["-tune", self.tune]
+        if self.bitrate:
+            args += ["-b:v", str(self.bitrate)]
+        else:
+            args += ["-crf", str(self.DEFAULT_CRF if self.crf is None else self.crf)]
+        if self.gop:
+            args += ["-g", str(self.gop)]
+        if self.threads:
+            args += ["-threads", str(self.threads)]
+        args += ["-pix_fmt", self.pix_fmt]
+        return args
+
+    def apply(self, process):
+        """
+        Apply nice and affinity to a started FFmpeg process.
+
+        Set from the parent after Popen returns: a preexec_fn would run
+        Python in the forked child, which can deadlock while other threads
+        are running. Failures are ignored; the process just runs
+        unthrottled. CPU affinity is only supported where
+        os.sched_setaffinity exists (Linux); on Windows a positive nice
+        value lowers the priority class.
+        """
+        if os.name == "nt":
+            if self.nice and self.nice > 0:
+                self._set_priority_class(process.pid)
+            return
+        try:
+            if self.nice:
+                os.setpriority(
+                    os.PRIO_PROCESS, process.pid,
+                    os.getpriority(os.PRIO_PROCESS, 0) + self.nice
+                )
+            if self.cpu_affinity and hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(process.pid, self.cpu_affinity)
+        except OSError:
+            pass  # Already exited, or not permitted
+
+    def _set_priority_class(self, pid):
+        """Lower the Windows priority class of a process."""
+        import ctypes
+        priority = (
+            subprocess.IDLE_PRIORITY_CLASS if self.nice >= 15
+            else subprocess.BELOW_NORMAL_PRIORITY_CLASS
+        )
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x0200, False, pid)  # SET_INFORMATION
+        if handle:
+            kernel32.SetPriorityClass(handle, priority)
+            kernel32.CloseHandle(handle)
+
+    def __repr__(self):
+        options = ", ".join(f"{k}={v!r}" for k, v in self.__dict__.items())
+        return f"EncoderSettings({options})"
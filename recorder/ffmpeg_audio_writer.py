@@ -0,0 +1,104 @@
+"""
+Streaming audio writer that pipes PCM blocks into an FFmpeg encoder.
+
+A drop-in replacement for WavStreamWriter: blocks are compressed to FLAC
+(lossless) or Opus while recording, so the temporary file is several times
+smaller than WAV and the final mux can stream-copy it instead of
+converting the audio to AAC.
+"""
+import subprocess
+import threading
+from collections import deque
+
+from recorder.encoder_settings import EncoderSettings
+
+# FFmpeg codec options for each compressed format (also the file suffix)
+AUDIO_CODEC_ARGS = {
+    "flac": ["-c:a", "flac", "-compression_level", "5"],
+    # Short Ogg pages so little is lost if the recording is killed
+    "opus": ["-c:a", "libopus", "-application", "audio", "-page_duration", "250000"],
+}
+
+
+class FFmpegAudioWriter:
+    """Encode int16 PCM blocks with FFmpeg as they arrive."""
+
+    def __init__(self, path, sample_rate, channels, audio_format="flac",
+                 bitrate="128k", settings=None):
+        if audio_format not in AUDIO_CODEC_ARGS:
+            raise ValueError(f"Unknown audio format: {audio_format}")
+        self.path = str(path)
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.audio_format = audio_format
+        self.bitrate = bitrate  # Opus only; FLAC is lossless
+        self.settings = settings or EncoderSettings()
+        self.data_bytes = 0
+        self._stderr_tail = deque(maxlen=20)
+        self._process = subprocess.Popen(
+            self._build_command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+        self.settings.apply(self._process)
+        # Drain stderr so FFmpeg never blocks on a full pipe
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+
+    @property
+    def frames_written(self):
+        """Number of sample frames written so far."""
+        return self.data_bytes // (self.channels * 2)
+
+    def _build_command(self):
+        """FFmpeg command reading interleaved s16le samples from stdin."""
+        codec_args = AUDIO_CODEC_ARGS[self.audio_format]
+        bitrate_args = ["-b:a", self.bitrate] if self.audio_format == "opus" else []
+        return [
+            "ffmpeg",
+            "-loglevel", "error",
+            # The format is given, so start encoding without probing the input
+            "-probesize", "32",
+            "-analyzeduration", "0",
+            "-f", "s16le",
+            "-ar", str(self.sample_rate),
+            "-ac", str(self.channels),
+            "-i", "pipe:0",
+            *codec_args,
+            *bitrate_args,
+            # Write each packet through, so a killed recording keeps its audio
+            "-flush_packets", "1",
+            "-y",
+            self.path
+        ]
+
+    def _drain_stderr(self):
+        """Keep the last few FFmpeg log lines for error reporting."""
+        for line in self._process.stderr:
+            self._stderr_tail.append(line.decode(errors="replace").rstrip())
+
+    def error_output(self):
+        """Return the tail of FFmpeg's log output."""
+        return "\n".join(self._stderr_tail)
+
+    def write(self, block):
+        """Append a block of interleaved int16 samples (a numpy array)."""
+        try:
+            self._process.stdin.write(block.data)
+        except (BrokenPipeError, OSError):
+            raise RuntimeError(f"FFmpeg audio pipe closed: {self.error_output()}")
+        self.data_bytes += block.nbytes
+
+    def close(self):
+        """Close the pipe and wait for FFmpeg to finish the file."""
+        if self._process is None:
+            return True
+        try:
+            self._process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        returncode = self._process.wait()
+        self._stderr_thread.join(timeout=1.0)
+        self._process = None
+        return returncode == 0
@@ -0,0 +1,145 @@
+"""
+Streaming video writer that pipes raw frames into an FFmpeg subprocess.
+
+Frames are encoded to H.264 while recording, so the output is final as soon
+as the pipe is closed instead of needing a second full re-encode.
+
+In variable frame rate mode frames are wrapped in a Matroska stream carrying
+their capture timestamps, so only changed frames need to be sent and
+encoded.
+
+With fragment_seconds the MP4 is written as a series of self-contained
+fragments behind an empty moov box, so the file stays playable up to the
+last complete fragment even if FFmpeg or the app is killed mid-recording.
+"""
+import subprocess
+import threading
+from collections import deque
+
+from recorder.mkv_stream import MatroskaRawStream
+from recorder.encoder_settings import EncoderSettings
+
+
+class FFmpegPipeWriter:
+    """Drop-in replacement for cv2.VideoWriter backed by an FFmpeg pipe."""
+
+    def __init__(self, output_path, fps, frame_size, input_pix_fmt="bgr24",
+                 settings=None, vfr=False, fragment_seconds=None):
+        self.output_path = str(output_path)
+        self.fps = fps
+        self.frame_size = frame_size  # (width, height)
+        self.input_pix_fmt = input_pix_fmt
+        self.settings = settings or EncoderSettings()
+        self.vfr = vfr  # Frames carry timestamps instead of a fixed rate
+        self.fragment_seconds = fragment_seconds  # None writes a regular MP4
+        self._process = None
+        self._mkv = None
+        self._stderr_tail = deque(maxlen=20)
+        self._stderr_thread = None
+        self._open()
+
+    def _build_command(self):
+        """Build the FFmpeg command line for frames on stdin."""
+        width, height = self.frame_size
+        if self.vfr:
+            input_args = ["-f", "matroska"]
+            # Keep container timestamps; B-frames would skew VFR MP4 durations
+            output_args = [
+                "-fps_mode", "vfr",
+                "-bf", "0",
+                "-video_track_timescale", "1000",
+            ]
+        else:
+            input_args = [
+                "-f", "rawvideo",
+                "-pix_fmt", self.input_pix_fmt,
+                "-s", f"{width}x{height}",
+                "-framerate", str(self.fps),
+            ]
+            output_args = []
+        if self.fragment_seconds:
+            output_args += [
+                "-movflags", "+frag_keyframe+empty_moov+default_base_moof",
+                "-frag_duration", str(int(self.fragment_seconds * 1000000)),
+                "-flush_packets", "1",
+            ]
+
+        return [
+            "ffmpeg",
+            "-loglevel", "error",
+            *input_args,
+            "-i", "pipe:0",
+            # libx264 with yuv420p needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            *self.settings.codec_args(),
+            *output_args,
+            "-y",
+            self.output_path
+        ]
+
+    def _open(self):
+        """Start the FFmpeg process."""
+        try:
+            self._process = subprocess.Popen(
+                self._build_command(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE
+            )
+        except FileNotFoundError:
+            self._process = None
+            return
+        self.settings.apply(self._process)
+
+        if self.vfr:
+            self._mkv = MatroskaRawStream(
+                self._process.stdin, self.frame_size, self.input_pix_fmt
+            )
+
+        # Drain stderr so FFmpeg never blocks on a full pipe
+        self._stderr_thread = threading.Thread(
+            target=self._drain_stderr, daemon=True
+        )
+        self._stderr_thread.start()
+
+    def _drain_stderr(self):
+        """Keep the last few FFmpeg log lines for error reporting."""
+        for line in self._process.stderr:
+            self._stderr_tail.append(line.decode(errors="replace").rstrip())
+
+    def isOpened(self):
+        """Whether the FFmpeg process is running."""
+        return self._process is not None and self._process.poll() is None
+
+    def write(self, frame, timestamp=None):
+        """
+        Write one frame (a contiguous uint8 array) to FFmpeg.
+
+        In VFR mode timestamp (seconds from start) is required.
+        """
+        try:
+            if self._mkv:
+                self._mkv.write_frame(frame, timestamp)
+            else:
+                self._process.stdin.write(frame.data)
+        except (BrokenPipeError, OSError):
+            raise RuntimeError(f"FFmpeg pipe closed: {self.error_output()}")
+
+    def error_output(self):
+        """Return the tail of FFmpeg's log output."""
+        return "\n".join(self._stderr_tail)
+
+    def release(self):
+        """Close the pipe and wait for FFmpeg to finalize the file."""
+        if self._process is None:
+            return True
+
+        try:
+            self._process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        returncode = self._process.wait()
+        if self._stderr_thread:
+            self._stderr_thread.join(timeout=1.0)
+        self._process = None
+        return returncode == 0
@@ -0,0 +1,163 @@
+"""
+Session telemetry: latency histograms, JSON sidecar files and an optional
+Prometheus-style text endpoint.
+
+ScreenRecorder, AudioRecorder and VideoEncoder each expose a metrics()
+dict; session_metrics() combines them into one document. It is written next
+to the saved recording as <name>.metrics.json and, when a MetricsServer is
+running, served live as Prometheus text on http://host:port/metrics.
+"""
+import json
+import math
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+# Upper bounds (milliseconds) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 33, 50, 100, 250, 500, 1000)
+
+METRIC_PREFIX = "screen_recorder"
+
+
+class Histogram:
+    """Fixed-bucket histogram covering a whole session."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Add one observation."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Cumulative bucket counts keyed by upper bound, plus count and sum."""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == math.inf else str(bound)] = cumulative
+        return {"buckets": buckets, "count": self.count, "sum": self.sum}
+
+
+def session_metrics(screen_recorder=None, audio_recorder=None, encoder=None):
+    """Combine the metrics of the session's components into one dict."""
+    data = {"timestamp": time.time()}
+    if screen_recorder is not None:
+        data["video"] = screen_recorder.metrics()
+    if audio_recorder is not None:
+        data["audio"] = audio_recorder.metrics()
+    if encoder is not None:
+        data["encode"] = encoder.metrics()
+    return data
+
+
+def sidecar_path(output_path):
+    """Path of the metrics file written next to a recording."""
+    output_path = Path(output_path)
+    return output_path.with_name(output_path.stem + ".metrics.json")
+
+
+def write_sidecar(output_path, data):
+    """Write session metrics next to the recording; return the file path."""
+    path = sidecar_path(output_path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=_json_default)
+    return path
+
+
+def _json_default(value):
+    # numpy scalars and other number-likes
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def _is_histogram(value):
+    return isinstance(value, dict) and {"buckets", "count", "sum"} <= value.keys()
+
+
+def to_prometheus(data, prefix=METRIC_PREFIX):
+    """
+    Render session metrics in the Prometheus text exposition format.
+
+    Nested keys are joined with underscores; histogram snapshots become
+    _bucket/_sum/_count series and every other number a gauge.
+    """
+    lines = []
+
+    def name_of(parts):
+        name = "_".join([prefix, *parts])
+        return "".join(c if c.isalnum() or c == "_" else "_" for c in name)
+
+    def walk(value, parts):
+        if _is_histogram(value):
+            name = name_of(parts)
+            lines.append(f"# TYPE {name} histogram")
+            for bound, count in value["buckets"].items():
+                lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"{name}_sum {value['sum']}")
+            lines.append(f"{name}_count {value['count']}")
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                walk(item, [*parts, str(key)])
+        elif isinstance(value, bool):
+            lines.append(f"{name_of(parts)} {int(value)}")
+        elif isinstance(value, (int, float)):
+            lines.append(f"{name_of(parts)} {float(value)}")
+        elif hasattr(value, "item"):
+            walk(value.item(), parts)
+
+    walk(data, [])
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serve live session metrics as Prometheus text on /metrics."""
+
+    def __init__(self, provider, host="127.0.0.1", port=9464):
+        self.provider = provider  # Callable returning a session_metrics() dict
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """Bind the port and serve from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        provider = self.provider
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = to_prometheus(provider()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the console
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Shut the server down."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
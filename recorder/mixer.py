@@ -0,0 +1,328 @@
+"""
+Multi-device audio capture and mixing.
+
+Each AudioInput opens its own sounddevice stream (a microphone, a
+PulseAudio/PipeWire monitor source, a "Stereo Mix" device...) whose
+callback only copies blocks into a SampleRing, exactly like the single
+device recorder did. AudioMixer runs on the recorder thread and combines
+the rings with vectorized NumPy:
+
+- The first input is the master: its samples define the timeline of the
+  mix, and its AudioClock is what the encoder lines up with the video.
+- Every other input is converted to the mix rate and channel count by a
+  linear-interpolation StreamResampler. Its sound card runs on its own
+  crystal, so its ring slowly fills or drains relative to the master; the
+  resampling ratio is nudged (by at most MAX_DRIFT_ADJUST) to keep about
+  TARGET_LATENCY seconds buffered. An input that runs dry is padded with
+  silence until it has caught up again.
+- Sources are scaled by their gain, summed and clipped to int16. The
+  resampled sources can also be returned one by one, for writing each to
+  a separate track.
+"""
+import numpy as np
+import sounddevice as sd
+
+from recorder.pipeline import SampleRing
+from recorder.sync import AudioClock
+
+# Seconds of audio kept buffered for each non-master input, to absorb
+# callback jitter between the devices
+TARGET_LATENCY = 0.05
+DRIFT_GAIN = 0.02  # Ratio adjustment per second of buffering error
+MAX_DRIFT_ADJUST = 0.005  # 0.5%, far below an audible pitch change
+RESYNC_SECONDS = 0.5  # Drop the backlog of an input this far behind
+FILL_SMOOTHING = 0.1  # Weight of each new fill reading in the average
+
+# Substrings of input device names that capture what the computer plays
+LOOPBACK_NAMES = (
+    "monitor", "loopback", "stereo mix", "what u hear", "wave out",
+    "blackhole", "soundflower",
+)
+
+
+def find_loopback_device():
+    """Name of the first input device that records system audio, or None."""
+    try:
+        devices = sd.query_devices()
+    except Exception:
+        return None
+    for device in devices:
+        name = device["name"]
+        if device["max_input_channels"] > 0 and any(
+            key in name.lower() for key in LOOPBACK_NAMES
+        ):
+            return name
+    return None
+
+
+def match_channels(block, channels):
+    """Up- or down-mix a (frames, n) float block to channels columns."""
+    have = block.shape[1]
+    if have == channels:
+        return block
+    if channels == 1:
+        return block.mean(axis=1, keepdims=True)
+    # Mono is copied to every channel, extra channels reuse the first ones
+    return block[:, np.arange(channels) % have]
+
+
+def to_int16(block):
+    """Round and clip a float block to int16 samples (in place)."""
+    np.rint(block, out=block)
+    np.clip(block, -32768, 32767, out=block)
+    return block.astype(np.int16)
+
+
+class AudioInput:
+    """One capture device: a sounddevice stream feeding a SampleRing."""
+
+    def __init__(self, device=None, gain=1.0, name=None, sample_rate=44100,
+                 channels=2, blocksize=0, latency=None, ring_seconds=2.0):
+        self.device = device  # PortAudio index or name; None for the default
+        self.gain = gain
+        self.name = name or ("Default input" if device is None else str(device))
+        self.sample_rate = sample_rate  # Replaced by open() if unsupported
+        self.channels = channels
+        self.blocksize = blocksize
+        self.latency = latency
+        self.ring_seconds = ring_seconds
+        self.clock = AudioClock(sample_rate)
+        self.ring = self._make_ring()
+        self.active = False  # Whether the callback keeps delivered blocks
+
+        # Telemetry; overflows mean the device dropped input samples
+        self.blocks_received = 0
+        self.input_overflows = 0
+        self.input_underflows = 0
+
+    def _make_ring(self):
+        # Room for several callbacks however small ring_seconds is
+        return SampleRing(
+            max(int(self.ring_seconds * self.sample_rate), 4 * self.blocksize,
+                self.sample_rate // 10),
+            self.channels
+        )
+
+    def open(self):
+        """
+        Negotiate the format and return the stream (started on enter).
+
+        Devices that cannot record at the requested rate or channel count
+        use their own; the mixer converts them.
+        """
+        info = sd.query_devices(self.device, "input")
+        channels = max(1, min(self.channels, int(info["max_input_channels"])))
+        try:
+            sd.check_input_settings(
+                self.device, channels=channels, dtype=np.int16,
+                samplerate=self.sample_rate
+            )
+        except Exception:
+            self.sample_rate = int(info["default_samplerate"])
+        if channels != self.channels or self.sample_rate != self.clock.sample_rate:
+            self.channels = channels
+            self.clock.sample_rate = self.sample_rate
+            self.ring = self._make_ring()
+
+        return sd.InputStream(
+            device=self.device,
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            callback=self._callback,
+            dtype=np.int16,
+            blocksize=self.blocksize,
+            latency=self.latency
+        )
+
+    def _callback(self, indata, frames, time_info, status):
+        """Callback for the audio stream (real-time thread: copy only)."""
+        if status:
+            if status.input_overflow:
+                self.input_overflows += 1
+            if status.input_underflow:
+                self.input_underflows += 1
+        if self.active:
+            # How long ago the block's first sample left the ADC
+            latency = time_info.currentTime - time_info.inputBufferAdcTime
+            self.clock.mark(frames, latency if 0 <= latency < 1 else None)
+            self.ring.write(indata)
+            self.blocks_received += 1
+
+    def snapshot(self):
+        """Ring statistics plus the negotiated format and device counters."""
+        stats = self.ring.snapshot()
+        stats.update({
+            "name": self.name,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "gain": self.gain,
+            "blocks_received": self.blocks_received,
+            "input_overflows": self.input_overflows,
+            "input_underflows": self.input_underflows,
+        })
+        return stats
+
+
+class StreamResampler:
+    """Linear-interpolation resampler for a continuous stream."""
+
+    def __init__(self, in_rate, out_rate, channels):
+        self.step = in_rate / out_rate  # Input frames per output frame
+        self._buffer = np.zeros((0, channels), dtype=np.float32)
+        self._pos = 0.0  # Fractional read position in _buffer
+
+    @property
+    def buffered(self):
+        """Input frames not consumed yet."""
+        return len(self._buffer) - self._pos
+
+    def feed(self, block):
+        """Append a block of input frames."""
+        self._buffer = np.concatenate((self._buffer, block.astype(np.float32)))
+
+    def available(self, adjust=0.0):
+        """Output frames that can be produced without running dry."""
+        last = len(self._buffer) - 1
+        if last < self._pos:
+            return 0
+        return int((last - self._pos) / (self.step * (1 + adjust))) + 1
+
+    def read(self, frames, adjust=0.0):
+        """
+        Return (block, missing): frames output frames, the last missing
+        of them silence because the input ran dry.
+
+        adjust speeds up (positive) or slows down consumption of the input
+        by that fraction, to follow a drifting clock.
+        """
+        step = self.step * (1 + adjust)
+        count = min(frames, self.available(adjust))
+        out = np.zeros((frames, self._buffer.shape[1]), dtype=np.float32)
+        if count:
+            positions = self._pos + step * np.arange(count)
+            index = positions.astype(np.int64)
+            frac = (positions - index)[:, None].astype(np.float32)
+            upper = np.minimum(index + 1, len(self._buffer) - 1)
+            out[:count] = self._buffer[index] * (1 - frac) + self._buffer[upper] * frac
+            self._pos = positions[-1] + step
+        self.skip(int(self._pos))
+        return out, frames - count
+
+    def skip(self, frames):
+        """Discard up to frames input frames."""
+        frames = min(frames, len(self._buffer))
+        self._buffer = self._buffer[frames:]
+        self._pos = max(0.0, self._pos - frames)
+
+
+class AudioMixer:
+    """Mix several AudioInputs onto the first one's timeline."""
+
+    def __init__(self, inputs, sample_rate, channels):
+        self.inputs = inputs
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.underrun_frames = [0] * len(inputs)  # Silence padded in
+        self.resynced_frames = [0] * len(inputs)  # Backlog dropped
+        self.drift_adjust = [0.0] * len(inputs)
+        self._chunks = []
+        self._resamplers = []
+        self._fill = [0.0] * len(inputs)  # Smoothed buffered seconds
+        self._primed = [False] * len(inputs)
+        self._passthrough = False
+
+    def prepare(self):
+        """Allocate buffers once the inputs are open and their formats known."""
+        self._chunks = [
+            # Drained in chunks of up to a tenth of a second
+            np.empty((max(1, source.sample_rate // 10), source.channels), dtype=np.int16)
+            for source in self.inputs
+        ]
+        self._resamplers = [
+            StreamResampler(source.sample_rate, self.sample_rate, source.channels)
+            for source in self.inputs
+        ]
+        master = self.inputs[0]
+        # A lone device in the output format needs no conversion at all
+        self._passthrough = len(self.inputs) == 1 and master.gain == 1.0 and (
+            master.sample_rate, master.channels) == (self.sample_rate, self.channels)
+
+    def mix(self, tracks=False):
+        """
+        Mix what the master input delivered since the last call.
+
+        Returns (mixed int16 block, list of per-input int16 blocks at unity
+        gain if tracks else []). The block is empty when the master has
+        nothing new; mixed may be a view of a buffer reused next call.
+        """
+        master = self.inputs[0]
+        if self._passthrough:
+            block = master.ring.read(self._chunks[0])
+            return block, [block] if tracks else []
+
+        block = master.ring.read(self._chunks[0])
+        if len(block):
+            self._resamplers[0].feed(block)
+        frames = self._resamplers[0].available()
+        if not frames:
+            return np.empty((0, self.channels), dtype=np.int16), []
+
+        mixed = np.zeros((frames, self.channels), dtype=np.float32)
+        sources = []
+        for i, source in enumerate(self.inputs):
+            if i == 0:
+                block, _ = self._resamplers[0].read(frames)
+            else:
+                block = self._follow(i, frames)
+            block = match_channels(block, self.channels)
+            if tracks:
+                sources.append(to_int16(block.copy()))
+            mixed += block * source.gain
+        return to_int16(mixed), sources
+
+    def _follow(self, i, frames):
+        """frames output frames of a non-master input, tracking its drift."""
+        source = self.inputs[i]
+        resampler = self._resamplers[i]
+        chunk = self._chunks[i]
+        while True:
+            block = source.ring.read(chunk)
+            if not len(block):
+                break
+            resampler.feed(block)
+
+        buffered = resampler.buffered / source.sample_rate
+        self._fill[i] += FILL_SMOOTHING * (buffered - self._fill[i])
+        if not self._primed[i]:
+            # Start (or restart after running dry) with a cushion buffered
+            if buffered < TARGET_LATENCY:
+                self.underrun_frames[i] += frames
+                return np.zeros((frames, source.channels), dtype=np.float32)
+            self._primed[i] = True
+            self._fill[i] = buffered
+        elif buffered > TARGET_LATENCY + RESYNC_SECONDS:
+            # Stalled and caught up in a burst: skip ahead instead of racing
+            excess = int((buffered - TARGET_LATENCY) * source.sample_rate)
+            resampler.skip(excess)
+            self.resynced_frames[i] += excess
+            self._fill[i] = TARGET_LATENCY
+
+        error = self._fill[i] - TARGET_LATENCY
+        adjust = max(-MAX_DRIFT_ADJUST, min(MAX_DRIFT_ADJUST, error * DRIFT_GAIN))
+        self.drift_adjust[i] = adjust
+        block, missing = resampler.read(frames, adjust)
+        if missing:
+            self.underrun_frames[i] += missing
+            self._primed[i] = False
+        return block
+
+    def snapshot(self):
+        """Per-input statistics keyed by input index."""
+        sources = {}
+        for i, source in enumerate(self.inputs):
+            stats = source.snapshot()
+            stats["underrun_frames"] = self.underrun_frames[i]
+            stats["resynced_frames"] = self.resynced_frames[i]
+            stats["drift_adjust_ppm"] = self.drift_adjust[i] * 1e6
+            sources[str(i)] = stats
+        return sources
@@ -0,0 +1,106 @@
+"""
+Minimal Matroska muxer for raw video frames with explicit timestamps.
+
+FFmpeg's rawvideo input has no notion of per-frame time, so variable frame
+rate recordings wrap each BGR frame in a Matroska SimpleBlock
+(V_UNCOMPRESSED) carrying its capture time. Only the handful of elements
+FFmpeg needs to demux the stream are written; the segment has unknown size
+so it can be produced as a live pipe.
+"""
+import struct
+
+# FourCCs Matroska uses to describe uncompressed pixel layouts
+PIX_FMT_FOURCC = {
+    "bgr24": b"BGR\x18",
+    "bgra": b"BGRA",
+}
+
+TIMESTAMP_SCALE = 1000000  # Nanoseconds per tick (1 ms)
+
+
+def _vint(value):
+    """Encode an EBML variable-size integer."""
+    for length in range(1, 9):
+        if value < (1 << (7 * length)) - 1:
+            encoded = value | (1 << (7 * length))
+            return encoded.to_bytes(length, "big")
+    raise ValueError(f"Value too large for EBML: {value}")
+
+
+def _element(element_id, payload):
+    """Encode an EBML element."""
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + _vint(len(payload)) + payload
+
+
+def _uint(element_id, value):
+    """Encode an unsigned integer element."""
+    return _element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def _string(element_id, value):
+    """Encode a string element."""
+    return _element(element_id, value.encode("ascii"))
+
+
+class MatroskaRawStream:
+    """Write raw frames with millisecond timestamps to a binary stream."""
+
+    def __init__(self, stream, frame_size, pix_fmt="bgr24"):
+        self.stream = stream
+        self.width, self.height = frame_size
+        self.fourcc = PIX_FMT_FOURCC[pix_fmt]
+        self._last_tick = -1
+        self._write_header()
+
+    def _write_header(self):
+        """Write the EBML header, segment start, info and track."""
+        ebml = _element(0x1A45DFA3, (
+            _uint(0x4286, 1)               # EBMLVersion
+            + _uint(0x42F7, 1)             # EBMLReadVersion
+            + _uint(0x42F2, 4)             # EBMLMaxIDLength
+            + _uint(0x42F3, 8)             # EBMLMaxSizeLength
+            + _string(0x4282, "matroska")  # DocType
+            + _uint(0x4287, 4)             # DocTypeVersion
+            + _uint(0x4285, 2)             # DocTypeReadVersion
+        ))
+        # Segment of unknown size, so it can be streamed
+        segment = (0x18538067).to_bytes(4, "big") + b"\x01" + b"\xff" * 7
+        info = _element(0x1549A966, (
+            _uint(0x2AD7B1, TIMESTAMP_SCALE)
+            + _string(0x4D80, "screen-recorder")  # MuxingApp
+            + _string(0x5741, "screen-recorder")  # WritingApp
+        ))
+        video = _element(0xE0, (
+            _uint(0xB0, self.width)             # PixelWidth
+            + _uint(0xBA, self.height)          # PixelHeight
+            + _element(0x2EB524, self.fourcc)   # ColourSpace
+        ))
+        track = _element(0xAE, (
+            _uint(0xD7, 1)                       # TrackNumber
+            + _uint(0x73C5, 1)                   # TrackUID
+            + _uint(0x83, 1)                     # TrackType: video
+            + _string(0x86, "V_UNCOMPRESSED")    # CodecID
+            + video
+        ))
+        tracks = _element(0x1654AE6B, track)
+        self.stream.write(ebml + segment + info + tracks)
+
+    def write_frame(self, frame, timestamp):
+        """Write one frame shown at timestamp (seconds from start)."""
+        # Timestamps must strictly increase after rounding to ticks
+        tick = max(int(round(timestamp * 1e9 / TIMESTAMP_SCALE)), self._last_tick + 1)
+        self._last_tick = tick
+
+        # Cluster{Timestamp, SimpleBlock{track 1, offset 0, keyframe, pixels}}
+        block_header = _vint(1) + struct.pack(">hB", 0, 0x80)
+        cluster_time = _uint(0xE7, tick)
+        block_size = len(block_header) + frame.nbytes
+        block_prefix = (0xA3).to_bytes(1, "big") + _vint(block_size)
+        cluster_size = len(cluster_time) + len(block_prefix) + block_size
+
+        self.stream.write(
+            (0x1F43B675).to_bytes(4, "big") + _vint(cluster_size)
+            + cluster_time + block_prefix + block_header
+        )
+        self.stream.write(frame.data)
@@ -0,0 +1,344 @@
+"""
+Frame pipeline primitives shared by the recorder stages.
+
+A FrameRing is a bounded ring of preallocated frame buffers that links two
+pipeline stages. The producer borrows a free slot, fills it in place and
+commits it; the consumer borrows the oldest committed slot and releases it
+once done, so no frame memory is allocated while recording.
+
+A ring created without a shape holds references instead: the producer
+stores an array it already owns (such as a zero-copy view of an mss
+screenshot) in the borrowed slot. Such a ring can hand every array back
+through on_release once no stage uses it any more, so the producer can
+reuse it.
+
+A SampleRing does the same for audio, between the sound card callback and
+the audio writer thread.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+
+from recorder.metrics import Histogram
+
+# Overflow policies applied when a producer finds the ring full
+POLICY_BLOCK = "block"
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_NEWEST = "drop_newest"
+OVERFLOW_POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_NEWEST)
+
+
+def wrap_screenshot(screenshot):
+    """View an mss ScreenShot's BGRA pixels as an array without copying."""
+    width, height = screenshot.size
+    return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(height, width, 4)
+
+
+class StageStats:
+    """Counters, recent latencies and a session histogram for one stage."""
+
+    LATENCY_SAMPLES = 4096  # Most recent per-frame latencies kept
+
+    def __init__(self, name):
+        self.name = name
+        self.processed = 0
+        self.busy_time = 0.0  # Seconds spent doing actual work
+        self.latencies = deque(maxlen=self.LATENCY_SAMPLES)
+        self.histogram = Histogram()  # Milliseconds, whole session
+
+    def record(self, duration, processed=True):
+        """Account for one frame that took duration seconds in this stage."""
+        if processed:
+            self.processed += 1
+        self.busy_time += duration
+        self.latencies.append(duration)
+        self.histogram.observe(duration * 1000)
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Latency percentiles in milliseconds over the recent samples."""
+        if not self.latencies:
+            return {f"p{point}": 0.0 for point in points}
+        values = np.percentile(np.fromiter(self.latencies, dtype=float), points)
+        return {f"p{point}": float(value) * 1000 for point, value in zip(points, values)}
+
+    def snapshot(self):
+        """Return the counters as a plain dict."""
+        return {
+            "processed": self.processed,
+            "busy_time": self.busy_time,
+            "latency_ms": self.percentiles(),
+        }
+
+
+class FrameRing:
+    """Bounded ring of preallocated frame buffers between two stages."""
+
+    def __init__(self, size, shape=None, dtype=np.uint8, policy=POLICY_BLOCK,
+                 on_release=None):
+        if size < 2:
+            raise ValueError("Frame ring needs at least two slots")
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+
+        self.size = size
+        self.policy = policy
+        # Reference rings only: called with a slot's array when the slot is
+        # released, cancelled or evicted; the slot forgets the array
+        self.on_release = on_release
+        if shape is None:
+            self.buffers = [None] * size
+        else:
+            self.buffers = [np.empty(shape, dtype=dtype) for _ in range(size)]
+        self.timestamps = [0.0] * size
+        self.sequences = [0] * size  # Output frame slot of each buffer
+        self.duplicates = [False] * size  # Slot repeats the previous frame
+
+        self._free = deque(range(size))
+        self._ready = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Statistics
+        self.dropped = 0
+        self.evicted = 0  # Non-duplicate frames taken back under drop_oldest
+        self.committed = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        """Number of committed slots waiting for the consumer."""
+        return len(self._ready)
+
+    def acquire_write(self, timeout=None):
+        """
+        Borrow a slot to fill.
+
+        Returns the slot index, or None if the frame must be dropped
+        (ring full under drop_newest, or the ring was closed).
+        """
+        with self._cond:
+            while not self._free:
+                if self._closed:
+                    return None
+                if self.policy == POLICY_DROP_NEWEST:
+                    self.dropped += 1
+                    return None
+                if self.policy == POLICY_DROP_OLDEST and self._ready:
+                    self.dropped += 1
+                    return self._evict()
+                # Block (or every slot is held by the consumer)
+                if not self._cond.wait(timeout):
+                    self.dropped += 1
+                    return None
+            if self._closed:
+                return None
+            return self._free.popleft()
+
+    def _evict(self):
+        """
+        Take back the oldest committed slot, preferring duplicate markers.
+
+        A dropped marker only leaves a gap the consumer fills anyway; a
+        dropped frame is counted in evicted so the producer can tell that
+        the consumer will not see it.
+        """
+        for index in self._ready:
+            if self.duplicates[index]:
+                self._ready.remove(index)
+                break
+        else:
+            self.evicted += 1
+            index = self._ready.popleft()
+        self._forget(index)
+        return index
+
+    def _forget(self, index):
+        """Hand a reference slot's array to on_release."""
+        if self.on_release is not None and self.buffers[index] is not None:
+            buffer, self.buffers[index] = self.buffers[index], None
+            self.on_release(buffer)
+
+    def commit(self, index, timestamp=0.0, sequence=0, duplicate=False):
+        """
+        Hand a filled slot to the consumer.
+
+        A duplicate slot carries no pixel data; it tells the consumer to
+        repeat the previous frame for this sequence number.
+        """
+        with self._cond:
+            self.timestamps[index] = timestamp
+            self.sequences[index] = sequence
+            self.duplicates[index] = duplicate
+            self._ready.append(index)
+            self.committed += 1
+            self.max_depth = max(self.max_depth, len(self._ready))
+            self._cond.notify_all()
+
+    def cancel(self, index):
+        """Return a borrowed slot without committing it."""
+        with self._cond:
+            self._forget(index)
+            self._free.append(index)
+            self._cond.notify_all()
+
+    def acquire_read(self, timeout=None):
+        """
+        Borrow the oldest committed slot.
+
+        Returns the slot index, or None on timeout or once the ring is
+        closed and fully drained.
+        """
+        with self._cond:
+            while not self._ready:
+                if self._closed:
+                    return None
+                if not self._cond.wait(timeout):
+                    return None
+            return self._ready.popleft()
+
+    def release(self, index):
+        """Give a consumed slot back to the producer."""
+        with self._cond:
+            self._forget(index)
+            self._free.append(index)
+            self._cond.notify_all()
+
+    def close(self):
+        """Stop accepting frames; readers drain what is left."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        """Whether close() has been called."""
+        return self._closed
+
+    def snapshot(self):
+        """Return ring statistics as a plain dict."""
+        with self._cond:
+            return {
+                "depth": len(self._ready),
+                "max_depth": self.max_depth,
+                "size": self.size,
+                "committed": self.committed,
+                "dropped": self.dropped,
+                "evicted": self.evicted,
+            }
+
+
+class SampleRing:
+    """
+    Single-producer, single-consumer ring of preallocated audio samples.
+
+    Made for the audio callback: write() only copies into the ring and
+    advances a counter, with no allocation and no lock. Each index is only
+    ever assigned by one side, and the producer publishes its index after
+    the samples are in place, so the consumer never sees a partial block.
+
+    A block that does not fit is dropped whole and counted as an overrun;
+    read() later returns the same number of zero samples in its place, so
+    the stream keeps its length and stays in sync with the video. Gaps live
+    in a fixed table of MAX_GAPS entries: back-to-back overruns add up into
+    one pending gap, which is published just before the next block that
+    fits, or by flush() once the stream has stopped. While the table is full, blocks are dropped into that pending gap
+    rather than queued, so overruns never allocate either.
+    """
+
+    MAX_GAPS = 64
+
+    def __init__(self, frames, channels, dtype=np.int16):
+        self.capacity = frames
+        self.buffer = np.zeros((frames, channels), dtype=dtype)
+        self.write_index = 0  # Frames ever written (producer only)
+        self.read_index = 0  # Frames ever read (consumer only)
+        self.overruns = 0
+        self.dropped_frames = 0
+        self.max_fill = 0
+        self._gap_starts = np.zeros(self.MAX_GAPS, dtype=np.int64)  # write_index at each gap
+        self._gap_frames = np.zeros(self.MAX_GAPS, dtype=np.int64)  # Frames dropped there
+        self._gaps_written = 0  # Gaps ever published (producer only)
+        self._gaps_read = 0  # Gaps ever taken (consumer only)
+        self._pending_gap = 0  # Dropped frames not yet published (producer only)
+        self._gap_left = 0  # Silence still owed for the current gap
+
+    @property
+    def fill(self):
+        """Frames waiting for the consumer."""
+        return self.write_index - self.read_index
+
+    def write(self, block):
+        """Copy a (frames, channels) block in; return False on overrun."""
+        frames = len(block)
+        start = self.write_index
+        gaps_full = self._gaps_written - self._gaps_read == self.MAX_GAPS
+        if frames > self.capacity - (start - self.read_index) or (self._pending_gap and gaps_full):
+            self.overruns += 1
+            self.dropped_frames += frames
+            self._pending_gap += frames
+            return False
+
+        self.flush()  # Publish any gap before the samples that follow it
+
+        offset = start % self.capacity
+        first = min(frames, self.capacity - offset)
+        self.buffer[offset:offset + first] = block[:first]
+        if first < frames:
+            self.buffer[:frames - first] = block[first:]
+        self.write_index = start + frames  # Publish once the data is in place
+        self.max_fill = max(self.max_fill, self.write_index - self.read_index)
+        return True
+
+    def flush(self):
+        """Publish a pending gap once the producer has stopped; False if no room."""
+        if not self._pending_gap:
+            return True
+        if self._gaps_written - self._gaps_read == self.MAX_GAPS:
+            return False
+        slot = self._gaps_written % self.MAX_GAPS
+        self._gap_starts[slot] = self.write_index
+        self._gap_frames[slot] = self._pending_gap
+        self._gaps_written += 1
+        self._pending_gap = 0
+        return True
+
+    def read(self, out):
+        """Copy up to len(out) of the oldest frames into out; return that view."""
+        # Read write_index first: any gap before those samples is already published
+        written = self.write_index
+        slot = self._gaps_read % self.MAX_GAPS
+        has_gap = self._gaps_read < self._gaps_written
+        if not self._gap_left and has_gap and self._gap_starts[slot] <= self.read_index:
+            self._gap_left = int(self._gap_frames[slot])
+            self._gaps_read += 1
+            slot = self._gaps_read % self.MAX_GAPS
+            has_gap = self._gaps_read < self._gaps_written
+        if self._gap_left:
+            frames = min(self._gap_left, len(out))
+            out[:frames] = 0
+            self._gap_left -= frames
+            return out[:frames]
+
+        # Stop at the next gap so its silence lands in the right place
+        limit = int(self._gap_starts[slot]) if has_gap else written
+        frames = min(min(limit, written) - self.read_index, len(out))
+        if frames <= 0:
+            return out[:0]
+        offset = self.read_index % self.capacity
+        first = min(frames, self.capacity - offset)
+        out[:first] = self.buffer[offset:offset + first]
+        if first < frames:
+            out[first:frames] = self.buffer[:frames - first]
+        self.read_index += frames
+        return out[:frames]
+
+    def snapshot(self):
+        """Return ring statistics as a plain dict."""
+        return {
+            "fill": self.fill,
+            "max_fill": self.max_fill,
+            "capacity": self.capacity,
+            "overruns": self.overruns,
+            "dropped_frames": self.dropped_frames,
+        }
@@ -0,0 +1,52 @@
+"""
+Live preview channel for the screen recorder.
+
+Full-resolution frames are never sent across threads. The recorder offers
+each frame to the channel, which returns immediately unless a preview
+widget is connected and the rate cap allows another update; only then is
+the frame downscaled (on the recorder's thread) and emitted.
+"""
+import time
+
+import cv2
+
+from recorder.core import Signal
+
+
+class PreviewChannel:
+    """Rate-limited, downscaled frame feed for preview widgets."""
+    
+    def __init__(self, max_fps=10, max_size=(320, 180)):
+        self.frame_ready = Signal()  # (small BGR numpy array)
+        self.max_fps = max_fps
+        self.max_size = max_size  # (width, height) bounding box
+        self._interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self._last_emit = 0.0
+        self.frames_emitted = 0
+    
+    @property
+    def active(self):
+        """Whether any preview widget is listening."""
+        return self.frame_ready.receivers() > 0
+    
+    def offer(self, frame):
+        """Emit a downscaled copy of frame if a preview update is due."""
+        if not self.active:
+            return
+        
+        now = time.monotonic()
+        if now - self._last_emit < self._interval:
+            return
+        self._last_emit = now
+        
+        # cv2.resize allocates a new array, so the ring slot can be reused
+        self.frame_ready.emit(
+            cv2.resize(frame, self._target_size(frame), interpolation=cv2.INTER_AREA)
+        )
+        self.frames_emitted += 1
+    
+    def _target_size(self, frame):
+        """Fit the frame inside max_size, keeping its aspect ratio."""
+        height, width = frame.shape[:2]
+        scale = min(self.max_size[0] / width, self.max_size[1] / height, 1.0)
+        return max(1, int(width * scale)), max(1, int(height * scale))
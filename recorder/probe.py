@@ -0,0 +1,97 @@
+"""
+Media probing helpers.
+
+Uses ffprobe when it is installed and falls back to parsing the stream
+summary `ffmpeg -i` prints, so a plain FFmpeg install is enough.
+"""
+import json
+import re
+import subprocess
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_STREAM_RE = re.compile(r"Stream #\d+:\d+.*?: (Video|Audio): (\w+)")
+
+
+def probe_media(path):
+    """
+    Describe a media file.
+
+    Returns a dict with duration (seconds), video_codec and audio_codec
+    (FFmpeg codec names such as "h264" or "pcm_s16le"); values that could
+    not be determined are None.
+    """
+    info = _probe_ffprobe(path)
+    if info is None:
+        info = _probe_ffmpeg(path)
+    return info
+
+
+def probe_duration(path):
+    """Return a media file's duration in seconds, or None if unknown."""
+    return probe_media(path)["duration"]
+
+
+def _empty():
+    return {"duration": None, "video_codec": None, "audio_codec": None}
+
+
+def _probe_ffprobe(path):
+    """Probe with ffprobe; None if ffprobe is unavailable."""
+    try:
+        result = subprocess.run(
+            [
+                "ffprobe",
+                "-v", "error",
+                "-show_entries", "format=duration:stream=codec_type,codec_name",
+                "-of", "json",
+                str(path)
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    info = _empty()
+    try:
+        data = json.loads(result.stdout or "{}")
+    except ValueError:
+        return info
+
+    try:
+        info["duration"] = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        pass
+    for stream in data.get("streams", []):
+        key = f"{stream.get('codec_type')}_codec"
+        if key in info and info[key] is None:
+            info[key] = stream.get("codec_name")
+    return info
+
+
+def _probe_ffmpeg(path):
+    """Probe by parsing the input summary ffmpeg prints to stderr."""
+    info = _empty()
+    try:
+        # ffmpeg fails for lack of an output, after describing the input
+        result = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-i", str(path)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return info
+
+    match = _DURATION_RE.search(result.stderr)
+    if match:
+        hours, minutes, seconds = match.groups()
+        info["duration"] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    for kind, codec in _STREAM_RE.findall(result.stderr):
+        key = f"{kind.lower()}_codec"
+        if info[key] is None:
+            info[key] = codec
+    return info
@@ -0,0 +1,213 @@
+"""
+Replay buffer ("instant replay") support.
+
+In replay mode nothing is written to disk while recording. ReplayBuffer
+takes the place of the video writer and keeps the most recent frames as
+JPEG images in a bounded ring; AudioRing does the same for microphone
+blocks. Both are limited by a duration, and the frame ring also by a byte
+budget, so memory use stays bounded however long the session runs.
+Unchanged frames share the previous frame's JPEG, so static screens cost
+almost nothing.
+
+ReplaySaver flushes a snapshot of both rings to an MP4 file in the
+background on request (e.g. from a hotkey).
+"""
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from recorder.core import Signal, Worker
+from recorder.wav_writer import WavStreamWriter
+from recorder.encoder_settings import EncoderSettings
+
+
+class ReplayBuffer:
+    """Video writer that keeps the last max_seconds as JPEG frames in memory."""
+
+    def __init__(self, fps, max_seconds=60, max_bytes=512 * 1024 * 1024, quality=80):
+        self.fps = fps
+        self.max_frames = max(1, int(max_seconds * fps))
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self._frames = deque()  # One JPEG (bytes) per output slot
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.frames_evicted = 0
+
+    def isOpened(self):
+        """Always open; matches the video writer interface."""
+        return True
+
+    def write(self, frame, timestamp=None):
+        """Compress and append one frame."""
+        ok, encoded = cv2.imencode(
+            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        )
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        self._append(encoded.tobytes(), new=True)
+
+    def repeat_last(self, count):
+        """Repeat the last frame count times without compressing it again."""
+        with self._lock:
+            if not self._frames:
+                return
+            data = self._frames[-1]
+        for _ in range(count):
+            self._append(data, new=False)
+
+    def _append(self, data, new):
+        with self._lock:
+            self._frames.append(data)
+            if new:
+                self._bytes += len(data)
+            # Drop the oldest frames beyond the duration or memory budget
+            while len(self._frames) > 1 and (
+                len(self._frames) > self.max_frames or self._bytes > self.max_bytes
+            ):
+                evicted = self._frames.popleft()
+                self.frames_evicted += 1
+                # Repeats share one bytes object; free it with the last one
+                if self._frames[0] is not evicted:
+                    self._bytes -= len(evicted)
+
+    def snapshot(self):
+        """Return the buffered JPEG frames, oldest first."""
+        with self._lock:
+            return list(self._frames)
+
+    @property
+    def memory_bytes(self):
+        """Bytes of JPEG data held."""
+        return self._bytes
+
+    @property
+    def duration(self):
+        """Seconds of video held."""
+        return len(self._frames) / self.fps
+
+    def release(self):
+        """Nothing to finalize; frames stay available for a last save."""
+        return True
+
+
+class AudioRing:
+    """Keep the last max_seconds of audio blocks."""
+
+    def __init__(self, sample_rate, channels, max_seconds=60):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.max_samples = int(max_seconds * sample_rate)
+        self._blocks = deque()
+        self._samples = 0
+        self._lock = threading.Lock()
+
+    def append(self, block):
+        """Add a (frames, channels) block, dropping the oldest audio."""
+        with self._lock:
+            self._blocks.append(block)
+            self._samples += len(block)
+            while self._blocks and self._samples - len(self._blocks[0]) >= self.max_samples:
+                self._samples -= len(self._blocks.popleft())
+
+    def snapshot(self, seconds=None):
+        """Return the last seconds of audio (all of it if None) as one array."""
+        with self._lock:
+            blocks = list(self._blocks)
+        if not blocks:
+            return np.zeros((0, self.channels), dtype=np.int16)
+        audio = np.concatenate(blocks)
+        if seconds is not None:
+            audio = audio[-int(seconds * self.sample_rate):]
+        return audio
+
+
+class ReplaySaver(Worker):
+    """Write a replay snapshot to a video file with FFmpeg."""
+
+    def __init__(self, frames, fps, output_path, audio=None, sample_rate=44100,
+                 settings=None):
+        super().__init__()
+        self.save_finished = Signal()  # (success, message)
+        self.frames = frames  # JPEG bytes, one per frame
+        self.fps = fps
+        self.output_path = Path(output_path)
+        self.audio = audio  # (samples, channels) int16 array or None
+        self.sample_rate = sample_rate
+        self.settings = settings or EncoderSettings()
+
+    def run(self):
+        """Pipe the JPEG frames into FFmpeg and mux the audio."""
+        if not self.frames:
+            self.save_finished.emit(False, "The replay buffer is empty.")
+            return
+
+        audio_path = None
+        try:
+            if self.audio is not None and len(self.audio):
+                audio_path = self.output_path.with_suffix(".replay.wav")
+                writer = WavStreamWriter(audio_path, self.sample_rate, self.audio.shape[1])
+                writer.write(self.audio)
+                writer.close()
+
+            with tempfile.TemporaryFile() as log:
+                process = subprocess.Popen(
+                    self._build_command(audio_path),
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=log
+                )
+                self.settings.apply(process)
+                try:
+                    for frame in self.frames:
+                        process.stdin.write(frame)
+                    process.stdin.close()
+                except (BrokenPipeError, OSError):
+                    pass  # FFmpeg exited; its log explains why
+                returncode = process.wait()
+                log.seek(0)
+                error = log.read().decode(errors="replace").strip()
+
+            if returncode == 0:
+                self.save_finished.emit(
+                    True,
+                    f"Replay ({len(self.frames) / self.fps:.0f}s) saved to: {self.output_path}"
+                )
+            else:
+                self.save_finished.emit(False, f"FFmpeg error: {error}")
+
+        except FileNotFoundError:
+            self.save_finished.emit(
+                False,
+                "FFmpeg not found. Please install FFmpeg and add it to PATH."
+            )
+        except Exception as e:
+            self.save_finished.emit(False, f"Replay save error: {str(e)}")
+        finally:
+            if audio_path is not None:
+                audio_path.unlink(missing_ok=True)
+
+    def _build_command(self, audio_path):
+        """FFmpeg command reading JPEG frames from stdin."""
+        audio_input = ["-i", str(audio_path)] if audio_path else []
+        audio_args = ["-c:a", "aac", "-b:a", "192k"] if audio_path else []
+        return [
+            "ffmpeg",
+            "-loglevel", "error",
+            "-f", "image2pipe",
+            "-framerate", str(self.fps),
+            "-c:v", "mjpeg",
+            "-i", "pipe:0",
+            *audio_input,
+            # libx264 with yuv420p needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            *self.settings.codec_args(),
+            *audio_args,
+            "-y",
+            str(self.output_path)
+        ]
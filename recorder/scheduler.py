@@ -0,0 +1,87 @@
+"""
+Timestamp-driven frame scheduler.
+
+Frame deadlines are absolute offsets from a monotonic epoch
+(epoch + n / fps), so sleep jitter and slow grabs never accumulate into
+drift. Each captured frame is assigned the output slot its grab time falls
+into; slots skipped while capture was behind are later filled with
+duplicates, keeping the output at exactly fps * duration frames.
+
+A scheduler created with realtime=False never sleeps: it runs on a virtual
+clock where every grab lands in the next slot, for sources that are not
+tied to the wall clock.
+"""
+import time
+
+
+class FrameScheduler:
+    """Monotonic-clock scheduler with absolute frame deadlines."""
+
+    def __init__(self, fps, clock=time.monotonic, sleep=time.sleep, realtime=True):
+        self.fps = fps
+        self.realtime = realtime
+        self.clock = clock
+        self.sleep = sleep
+        self.epoch = None
+        self.next_slot = 0
+        self.skipped_slots = 0  # Slots missed because capture was late
+
+    def start(self, epoch=None):
+        """Start the clock, optionally at a shared epoch."""
+        self.epoch = self.clock() if epoch is None else epoch
+        self.next_slot = 0
+        self.skipped_slots = 0
+
+    def deadline(self, slot):
+        """Absolute clock time at which a slot should be captured."""
+        return self.epoch + slot / self.fps
+
+    def slot_at(self, timestamp):
+        """Slot index covering an absolute clock time."""
+        return max(0, int((timestamp - self.epoch) * self.fps))
+
+    def elapsed(self, timestamp=None):
+        """Seconds since the epoch."""
+        if timestamp is None:
+            timestamp = self.clock()
+        return timestamp - self.epoch
+
+    def now(self):
+        """Current scheduler time (virtual time when not realtime)."""
+        if self.realtime:
+            return self.clock()
+        return self.deadline(self.next_slot)
+
+    def stop(self):
+        """Return the stop time for a recording ending now."""
+        if self.realtime:
+            return self.clock()
+        # Virtual clock: the recording ends at the last claimed slot
+        return self.deadline(max(self.next_slot - 1, 0))
+
+    def wait_next(self, max_sleep=0.1):
+        """
+        Sleep until the next slot's deadline.
+
+        Sleeps in chunks of at most max_sleep seconds and returns False if
+        the deadline has not been reached yet, so callers can poll a stop
+        flag; returns True once it is time to capture.
+        """
+        if not self.realtime:
+            return True
+        remaining = self.deadline(self.next_slot) - self.clock()
+        if remaining <= 0:
+            return True
+        self.sleep(min(remaining, max_sleep))
+        return remaining <= max_sleep
+
+    def claim(self, timestamp):
+        """Assign the slot for a frame grabbed at an absolute clock time."""
+        slot = max(self.slot_at(timestamp), self.next_slot)
+        self.skipped_slots += slot - self.next_slot
+        self.next_slot = slot + 1
+        return slot
+
+    def total_slots(self, stop_time):
+        """Number of output frames (deadlines reached) for a stop at stop_time."""
+        return int(self.elapsed(stop_time) * self.fps) + 1
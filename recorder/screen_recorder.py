@@ -1,106 +1,509 @@
 """
 Screen recording module using mss and OpenCV.
+
+Frames come from a FrameSource (recorder/sources.py): the screen via mss by
+default, or a synthetic/file source for headless runs. Non-live sources are
+not paced by the wall clock, so the pipeline runs at full speed.
+
+Recording runs as three pipelined stages so a slow encode never stalls the
+next grab:
+
+    capture (mss) -> raw ring -> convert (BGRA->BGR) -> bgr ring -> write
+
+The capture stage runs on the recorder's own thread (a plain Worker, see
+recorder/core.py); convert and write each get their own worker thread.
+
+Frames are not copied on the way: the raw ring holds zero-copy views of each
+mss screenshot buffer, and cvtColor writes straight into the preallocated
+BGR ring slot the writer reads from.
+
+With streaming enabled the write stage pipes frames straight into an FFmpeg
+H.264 encoder instead of OpenCV's mp4v writer, so the output needs no second
+encode pass.
+
+With change detection enabled the convert stage compares each grab with
+the previous one; identical frames skip cvtColor and reach the writer as
+duplicate markers instead of pixel data.
+
+In variable frame rate mode (streaming only) duplicates are never written:
+each unique frame is sent with its capture timestamp and the last one is
+repeated once at the stop time so the video spans the full duration.
+
+With fragment_seconds the FFmpeg pipe writes fragmented MP4, so a crash
+leaves a playable file (see recorder/session.py for recovery).
+
+In segmented mode the writer rotates to a new chunk file every
+segment_seconds; finished chunks are encoded in the background. Stopping
+only closes the last chunk: the SegmentedWriter is left in self.segments
+for VideoEncoder(segments=...) to encode it and join the chunks without
+re-encoding (see recorder/segments.py).
+
+In replay mode nothing is written to disk: the write stage feeds a bounded
+in-memory ReplayBuffer holding the last replay_seconds of frames, which can
+be saved at any time (see recorder/replay.py).
+
+Capture is paced by a FrameScheduler with absolute deadlines; the write
+stage duplicates frames into slots that capture missed, so the output always
+holds fps * duration frames and stays in step with the audio track.
+
+Given a shared epoch (a time.monotonic() value also passed to the audio
+recorder), frame n belongs at epoch + n / fps: slots that pass while the
+capture thread starts up are filled with the first frame, so the video
+starts at the epoch rather than whenever this thread got going.
 """
-import mss
+import threading
+import time
+from array import array
+
 import cv2
-import numpy as np
-from PyQt5.QtCore import QThread, pyqtSignal
 
+from recorder.core import Signal, Worker
+from recorder.pipeline import FrameRing, StageStats, POLICY_BLOCK
+from recorder.ffmpeg_writer import FFmpegPipeWriter
+from recorder.encoder_settings import EncoderSettings
+from recorder.scheduler import FrameScheduler
+from recorder.damage import ChangeDetector
+from recorder.preview import PreviewChannel
+from recorder.sources import MssSource
+from recorder.segments import SegmentedWriter, SegmentPool
+from recorder.replay import ReplayBuffer
 
-class ScreenRecorder(QThread):
+
+class ScreenRecorder(Worker):
     """Screen recorder that runs in a separate thread."""
-    
-    error_occurred = pyqtSignal(str)
-    frame_captured = pyqtSignal(object)  # For live preview
-    
-    def __init__(self, output_path, fps=30, region=None, codec="mp4v"):
+
+    STATS_INTERVAL = 1.0  # seconds
+
+    def __init__(self, output_path, fps=30, region=None, codec="mp4v",
+                 ring_size=8, overflow_policy=POLICY_BLOCK, streaming=False,
+                 encoder_settings=None, skip_unchanged=True,
+                 vfr=False, preview_fps=10, preview_size=(320, 180), source=None,
+                 segment_seconds=None, segment_workers=2, replay_seconds=None,
+                 replay_max_bytes=512 * 1024 * 1024, replay_quality=80, epoch=None,
+                 fragment_seconds=None):
         super().__init__()
+        self.error_occurred = Signal()  # (message)
+        self.stats_updated = Signal()  # (stats dict) per-stage queue depth and drops
         self.output_path = output_path
         self.fps = fps
         self.region = region  # (x, y, width, height) or None for full screen
         self.codec = codec
+        self.ring_size = ring_size
+        self.overflow_policy = overflow_policy
+        self.streaming = streaming  # Encode H.264 through an FFmpeg pipe
+        # libx264 options and scheduling for every FFmpeg encode we start
+        self.encoder_settings = encoder_settings or EncoderSettings()
+        # Keep only the last replay_seconds in memory instead of writing a file
+        self.replay = ReplayBuffer(
+            fps, replay_seconds, replay_max_bytes, replay_quality
+        ) if replay_seconds else None
+        # Chunk length in seconds; None records a single file
+        self.segment_seconds = segment_seconds if self.replay is None else None
+        self.segment_workers = segment_workers
+        # VFR needs the FFmpeg pipe; chunks and replays use a constant rate
+        self.vfr = vfr and streaming and not self.segment_seconds and self.replay is None
+        self.fragment_seconds = fragment_seconds  # Crash-safe MP4 fragments (FFmpeg only)
+        self.source = source if source is not None else MssSource(region)
         self._is_recording = False
         self._writer = None
-    
+        self.segments = None  # SegmentedWriter still to finish, in segmented mode
+
+        # Live preview; costs nothing unless a widget is connected
+        self.preview = PreviewChannel(preview_fps, preview_size)
+
+        self._raw_ring = None
+        self._bgr_ring = None
+        self._stats = {
+            name: StageStats(name) for name in ("capture", "convert", "write")
+        }
+
+        self._scheduler = FrameScheduler(fps, realtime=self.source.live)
+        # Shared session start; only a live source runs on the wall clock
+        self._epoch = epoch if self.source.live else None
+        self._detector = ChangeDetector() if skip_unchanged else None
+        self._convert_time = 0.0  # Seconds spent in cvtColor
+        self._converted = 0
+        self._stop_time = None
+        self.frames_written = 0
+        self.frames_duplicated = 0
+        self.frames_late = 0  # Arrived after their slot was already filled
+
+        # Capture time (seconds since start) and output slot of each unique frame
+        self.frame_timestamps = array("d")
+        self.frame_sequences = array("q")
+
     def run(self):
         """Start screen recording."""
         self._is_recording = True
-        
+        workers = []
+
         try:
-            with mss.mss() as sct:
-                # Determine capture region
-                if self.region:
-                    monitor = {
-                        "left": self.region[0],
-                        "top": self.region[1],
-                        "width": self.region[2],
-                        "height": self.region[3]
-                    }
-                else:
-                    monitor = sct.monitors[1]  # Primary monitor
-                
-                # Get dimensions
-                width = monitor["width"]
-                height = monitor["height"]
-                
+            # The source is opened here, on the capture thread
+            with self.source as source:
+                width, height = source.size
+
                 # Initialize video writer
-                fourcc = cv2.VideoWriter_fourcc(*self.codec)
-                self._writer = cv2.VideoWriter(
-                    str(self.output_path),
-                    fourcc,
-                    self.fps,
-                    (width, height)
-                )
-                
+                self._writer = self._open_writer(width, height)
+
                 if not self._writer.isOpened():
                     self.error_occurred.emit("Failed to open video writer")
                     return
-                
-                # Calculate frame delay
-                frame_delay = 1.0 / self.fps
-                
-                import time
-                last_time = time.time()
-                
-                # Capture loop
-                while self._is_recording:
-                    # Capture screen
-                    screenshot = sct.grab(monitor)
-                    
-                    # Convert to numpy array
-                    frame = np.array(screenshot)
-                    
-                    # Convert BGRA to BGR
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                    
-                    # Write frame
-                    self._writer.write(frame)
-                    
-                    # Emit frame for preview (optional)
-                    self.frame_captured.emit(frame)
-                    
-                    # FPS control
-                    current_time = time.time()
-                    elapsed = current_time - last_time
-                    sleep_time = max(0, frame_delay - elapsed)
-                    
-                    if sleep_time > 0:
-                        time.sleep(sleep_time)
-                    
-                    last_time = time.time()
-        
+
+                # Raw slots reference screenshot buffers, handed back to the
+                # source once converted; BGR slots are preallocated
+                self._raw_ring = FrameRing(
+                    self.ring_size, policy=self.overflow_policy,
+                    on_release=source.recycle
+                )
+                self._bgr_ring = FrameRing(
+                    self.ring_size, (height, width, 3), policy=self.overflow_policy
+                )
+
+                workers = [
+                    threading.Thread(target=self._convert_loop, daemon=True),
+                    threading.Thread(target=self._write_loop, daemon=True),
+                ]
+                for worker in workers:
+                    worker.start()
+
+                self._scheduler.start(self._epoch)
+                self._capture_loop(source)
+
         except Exception as e:
             self.error_occurred.emit(f"Screen recording error: {str(e)}")
-        
+
         finally:
+            # Let the downstream stages drain before releasing the writer
+            if self._scheduler.epoch is not None:
+                self._stop_time = self._scheduler.stop()
+            if self._raw_ring:
+                self._raw_ring.close()
+            for worker in workers:
+                worker.join()
+            self.stats_updated.emit(self.get_stats())
             self._cleanup()
-    
+
+    def _open_writer(self, width, height):
+        """Create the writer: replay buffer, segmented, FFmpeg pipe or OpenCV."""
+        if self.replay is not None:
+            return self.replay
+        if not self.segment_seconds:
+            return self._open_file_writer(self.output_path, width, height)
+
+        # Streaming chunks are already H.264; OpenCV chunks get encoded
+        pool = SegmentPool(
+            self.segment_workers,
+            self.encoder_settings,
+            transcode=not self.streaming
+        )
+        self.segments = SegmentedWriter(
+            self.output_path,
+            lambda path: self._open_file_writer(path, width, height),
+            ".mp4" if self.streaming else ".avi",
+            self.segment_seconds * self.fps,
+            pool
+        )
+        return self.segments
+
+    def _open_file_writer(self, path, width, height):
+        """Create the FFmpeg pipe or OpenCV writer for one file."""
+        if self.streaming:
+            return FFmpegPipeWriter(
+                path,
+                self.fps,
+                (width, height),
+                settings=self.encoder_settings,
+                vfr=self.vfr,
+                fragment_seconds=self.fragment_seconds
+            )
+
+        fourcc = cv2.VideoWriter_fourcc(*self.codec)
+        return cv2.VideoWriter(
+            str(path),
+            fourcc,
+            self.fps,
+            (width, height)
+        )
+
+    def _capture_loop(self, source):
+        """Capture stage: grab frames into the raw ring on schedule."""
+        stats = self._stats["capture"]
+        ring = self._raw_ring
+        scheduler = self._scheduler
+
+        # Live capture drops a frame rather than fall behind; other sources wait
+        write_timeout = 1.0 / self.fps if source.live else None
+        last_stats = time.monotonic()
+
+        while self._is_recording:
+            # Wait for the next absolute deadline
+            if not scheduler.wait_next():
+                continue
+
+            # Capture frame
+            started = time.perf_counter()
+            grab_time = scheduler.now()
+            frame = source.grab()
+            if frame is None:
+                break  # Source exhausted
+            sequence = scheduler.claim(grab_time)
+
+            index = ring.acquire_write(timeout=write_timeout)
+            if index is not None:
+                ring.buffers[index] = frame
+                ring.commit(index, scheduler.elapsed(grab_time), sequence)
+            else:
+                source.recycle(frame)  # Dropped
+            stats.record(time.perf_counter() - started, processed=index is not None)
+
+            now = time.monotonic()
+            if now - last_stats >= self.STATS_INTERVAL:
+                self.stats_updated.emit(self.get_stats())
+                last_stats = now
+
+    def _convert_loop(self):
+        """
+        Convert stage: BGRA frames from the raw ring into the BGR ring.
+
+        With change detection on, the last converted raw frame stays
+        borrowed so the next grab can be compared against it without a copy.
+        """
+        stats = self._stats["convert"]
+        src, dst = self._raw_ring, self._bgr_ring
+        detector = self._detector
+        held = None  # Raw ring slot of the last converted frame
+
+        try:
+            while True:
+                index = src.acquire_read(timeout=0.1)
+                if index is None:
+                    if src.closed:
+                        break
+                    continue
+
+                started = time.perf_counter()
+                frame = src.buffers[index]
+                evicted = dst.evicted
+                out = dst.acquire_write()
+                if dst.evicted != evicted and held is not None:
+                    # drop_oldest took back a frame the writer had not seen,
+                    # maybe the one compared against: send the next one whole
+                    src.release(held)
+                    held = None
+                unchanged = (
+                    out is not None and detector is not None and held is not None
+                    and detector.is_unchanged(frame, src.buffers[held])
+                )
+
+                if out is None:
+                    # Dropped; keep comparing against what the writer has
+                    src.release(index)
+                elif unchanged:
+                    # Identical to the previous frame: the writer repeats it
+                    dst.commit(
+                        out, src.timestamps[index], src.sequences[index],
+                        duplicate=True
+                    )
+                    src.release(index)
+                else:
+                    converting = time.perf_counter()
+                    cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=dst.buffers[out])
+                    self._convert_time += time.perf_counter() - converting
+                    self._converted += 1
+
+                    dst.commit(out, src.timestamps[index], src.sequences[index])
+
+                    if detector is None:
+                        src.release(index)
+                    else:
+                        if held is not None:
+                            src.release(held)
+                        held = index
+                stats.record(time.perf_counter() - started, processed=out is not None)
+
+        except Exception as e:
+            self._is_recording = False
+            self.error_occurred.emit(f"Frame conversion error: {str(e)}")
+
+        finally:
+            if held is not None:
+                src.release(held)
+            # Unblock the capture stage if we bailed out early
+            src.close()
+            dst.close()
+
+    def _write_loop(self):
+        """
+        Write stage: encode frames from the BGR ring.
+
+        The last written frame stays borrowed so it can be repeated into
+        slots that capture missed, and to pad the tail up to the stop time.
+        """
+        stats = self._stats["write"]
+        src = self._bgr_ring
+        held = None  # Ring slot of the last written frame
+
+        try:
+            while True:
+                index = src.acquire_read(timeout=0.1)
+                if index is None:
+                    if src.closed:
+                        break
+                    continue
+
+                started = time.perf_counter()
+                sequence = src.sequences[index]
+                if sequence < self.frames_written:
+                    # Its slot was already filled by a duplicate
+                    self.frames_late += 1
+                    src.release(index)
+                    continue
+
+                if src.duplicates[index]:
+                    # Unchanged screen: repeat the held frame up to this slot
+                    src.release(index)
+                    if held is not None:
+                        self._write_repeated(
+                            src.buffers[held], sequence - self.frames_written + 1
+                        )
+                    stats.record(time.perf_counter() - started)
+                    continue
+
+                # Fill missed slots, then write the new frame
+                gap_source = src.buffers[held if held is not None else index]
+                self._write_repeated(gap_source, sequence - self.frames_written)
+                if held is not None:
+                    src.release(held)
+
+                frame = src.buffers[index]
+                if self.vfr:
+                    self._writer.write(frame, src.timestamps[index])
+                else:
+                    self._writer.write(frame)
+                self.frames_written += 1
+                self.frame_timestamps.append(src.timestamps[index])
+                self.frame_sequences.append(sequence)
+                held = index
+
+                self.preview.offer(frame)
+
+                stats.record(time.perf_counter() - started)
+
+            # Pad with the last frame so the output spans the full duration
+            if held is not None and self._stop_time is not None:
+                total = self._scheduler.total_slots(self._stop_time)
+                self._write_repeated(src.buffers[held], total - self.frames_written)
+                if self.vfr:
+                    self._writer.write(
+                        src.buffers[held], self._scheduler.elapsed(self._stop_time)
+                    )
+
+        except Exception as e:
+            self._is_recording = False
+            self.error_occurred.emit(f"Frame write error: {str(e)}")
+
+        finally:
+            if held is not None:
+                src.release(held)
+            # Unblock the convert stage if we bailed out early
+            src.close()
+
+    def _write_repeated(self, frame, count):
+        """
+        Write a frame count times to fill skipped output slots.
+
+        In VFR mode the slots are only accounted for; the previous frame
+        simply stays on screen until the next timestamp.
+        """
+        count = max(0, count)
+        if hasattr(self._writer, "repeat_last"):
+            # The replay buffer reuses the last compressed frame
+            self._writer.repeat_last(count)
+        elif not self.vfr:
+            for _ in range(count):
+                self._writer.write(frame)
+        self.frames_written += count
+        self.frames_duplicated += count
+
+    def get_stats(self):
+        """
+        Return per-stage counters.
+
+        Each stage reports the depth of the ring it feeds and how many
+        frames were dropped because that ring was full.
+        """
+        stats = {name: s.snapshot() for name, s in self._stats.items()}
+        for name, ring in (("capture", self._raw_ring), ("convert", self._bgr_ring)):
+            queue = ring.snapshot() if ring else {}
+            stats[name]["queue_depth"] = queue.get("depth", 0)
+            stats[name]["max_queue_depth"] = queue.get("max_depth", 0)
+            stats[name]["dropped"] = queue.get("dropped", 0)
+        stats["write"]["dropped"] = self.frames_late
+        stats["write"]["frames_written"] = self.frames_written
+        stats["write"]["duplicated"] = self.frames_duplicated
+        if self._stop_time is not None:
+            stats["write"]["expected_frames"] = self._scheduler.total_slots(self._stop_time)
+        stats["capture"]["late_slots"] = self._scheduler.skipped_slots
+        if self.replay is not None:
+            stats["write"]["replay_seconds"] = self.replay.duration
+            stats["write"]["replay_bytes"] = self.replay.memory_bytes
+
+        detector = self._detector
+        if detector is not None:
+            # CPU saved = skipped frames at the measured cost of a conversion
+            avg_convert = self._convert_time / self._converted if self._converted else 0.0
+            stats["convert"]["skipped"] = detector.unchanged
+            stats["convert"]["skip_ratio"] = detector.skip_ratio
+            stats["convert"]["cpu_saved"] = detector.unchanged * avg_convert
+            stats["convert"]["compare_time"] = detector.compare_time
+        return stats
+
+    def metrics(self):
+        """Session telemetry: stage counters, latency histograms and fps."""
+        stats = self.get_stats()
+        if self._stop_time is not None:
+            elapsed = self.duration
+        elif self._scheduler.epoch is not None:
+            elapsed = self._scheduler.elapsed()
+        else:
+            elapsed = 0.0
+        captured = stats["capture"]["processed"]
+        return {
+            "target_fps": self.fps,
+            "duration": elapsed,
+            "achieved_fps": captured / elapsed if elapsed else 0.0,
+            "frames_captured": captured,
+            "frames_written": self.frames_written,
+            "frames_duplicated": self.frames_duplicated,
+            "frames_dropped": sum(stage["dropped"] for stage in stats.values()),
+            "stages": stats,
+            "latency_ms": {
+                name: stage.histogram.snapshot() for name, stage in self._stats.items()
+            },
+        }
+
+    @property
+    def epoch(self):
+        """Monotonic clock time of output frame 0 (None before capture starts)."""
+        return self._scheduler.epoch
+
+    @property
+    def duration(self):
+        """Seconds from capture start to stop (0 before recording stops)."""
+        if self._stop_time is None:
+            return 0.0
+        return self._scheduler.elapsed(self._stop_time)
+
     def stop_recording(self):
         """Stop screen recording."""
         self._is_recording = False
-    
+
     def _cleanup(self):
         """Clean up resources."""
         if self._writer:
-            self._writer.release()
+            # FFmpegPipeWriter reports whether the file was finalized
+            if self._writer.release() is False:
+                self.error_occurred.emit(
+                    f"FFmpeg failed to finalize video: {self._writer.error_output()}"
+                )
             self._writer = None
@@ -0,0 +1,229 @@
+"""
+Segmented recording: rolling chunk files with background encoding.
+
+SegmentedWriter stands in for a single video writer and rotates to a new
+chunk file every N frames. Each finished chunk is handed to a SegmentPool,
+which encodes it to H.264 on a worker thread while recording continues
+(chunks from the streaming writer are already H.264 and are kept as is).
+At stop only the last chunk still needs encoding; the chunks are then
+joined with FFmpeg's concat demuxer without re-encoding, so finalizing
+takes about the same time whatever the recording length.
+
+release() only closes the last chunk, so stopping the recorder returns
+at once; finish() waits for the encodes and joins, and is called by
+VideoEncoder on its own thread, where it reports progress and can be
+cancelled.
+"""
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from recorder.encoder_settings import EncoderSettings
+
+
+class SegmentPool:
+    """Background H.264 encoder for finished chunks."""
+
+    def __init__(self, workers=2, settings=None, transcode=True):
+        self.settings = settings or EncoderSettings()
+        self.transcode = transcode  # False when chunks are already H.264
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="segment-encode"
+        ) if transcode else None
+        self._futures = []
+
+    def submit(self, path):
+        """Queue a finished chunk for encoding."""
+        if self._executor is None:
+            self._futures.append(_Done(Path(path)))
+        else:
+            self._futures.append(self._executor.submit(self._encode, Path(path)))
+
+    def _encode(self, path):
+        """Encode one chunk to H.264 and delete the source chunk."""
+        output = path.with_suffix(".mp4")
+        process = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-loglevel", "error",
+                "-i", str(path),
+                # libx264 with yuv420p needs even dimensions
+                "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                *self.settings.codec_args(),
+                "-an",
+                "-y",
+                str(output)
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+        self.settings.apply(process)
+        _, error = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"Encoding {path.name} failed: {error.strip()}")
+        path.unlink()
+        return output
+
+    @property
+    def pending(self):
+        """Chunks still being encoded."""
+        return sum(1 for future in self._futures if not future.done())
+
+    def results(self):
+        """Wait for every chunk; return the encoded paths in order."""
+        try:
+            return [future.result() for future in self._futures]
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+
+class _Done:
+    """Already-finished stand-in for a Future."""
+
+    def __init__(self, value):
+        self._value = value
+
+    def done(self):
+        return True
+
+    def result(self):
+        return self._value
+
+
+class SegmentedWriter:
+    """
+    Video writer that rotates to a new chunk every segment_frames frames.
+
+    open_chunk(path) must return a writer with isOpened(), write() and
+    release(), such as cv2.VideoWriter or FFmpegPipeWriter. finish() joins
+    the chunks into output_path.
+    """
+
+    def __init__(self, output_path, open_chunk, chunk_suffix, segment_frames, pool):
+        self.output_path = Path(output_path)
+        self.chunk_dir = self.output_path.with_name(self.output_path.stem + "_segments")
+        self.open_chunk = open_chunk
+        self.chunk_suffix = chunk_suffix
+        self.segment_frames = max(1, int(segment_frames))
+        self.pool = pool
+        self.segments = 0  # Chunks started
+        self._chunk = None
+        self._chunk_path = None
+        self._chunk_frames = 0
+        self._errors = deque(maxlen=20)
+
+        if self.chunk_dir.exists():
+            shutil.rmtree(self.chunk_dir)  # Leftovers from an earlier session
+        self.chunk_dir.mkdir(parents=True)
+        self._rotate()
+
+    def _rotate(self):
+        """Close the current chunk, queue it for encoding and start the next."""
+        self._close_chunk()
+        self._chunk_path = self.chunk_dir / f"chunk_{self.segments:05d}{self.chunk_suffix}"
+        self._chunk = self.open_chunk(self._chunk_path)
+        self._chunk_frames = 0
+        self.segments += 1
+        if not self._chunk.isOpened():
+            raise RuntimeError(f"Failed to open segment {self._chunk_path.name}")
+
+    def _close_chunk(self):
+        """Finalize the current chunk and hand it to the pool."""
+        if self._chunk is None:
+            return
+        chunk, self._chunk = self._chunk, None
+        # FFmpegPipeWriter reports whether the chunk was finalized
+        if chunk.release() is False:
+            self._errors.append(
+                f"Segment {self._chunk_path.name} failed: {chunk.error_output()}"
+            )
+        elif self._chunk_frames:
+            self.pool.submit(self._chunk_path)
+
+    def isOpened(self):
+        """Whether the current chunk writer is open."""
+        return self._chunk is not None and self._chunk.isOpened()
+
+    def write(self, frame, timestamp=None):
+        """Write one frame, starting a new chunk when the current one is full."""
+        if self._chunk_frames >= self.segment_frames:
+            self._rotate()
+        self._chunk.write(frame)
+        self._chunk_frames += 1
+
+    @property
+    def pending(self):
+        """Finished chunks still being encoded."""
+        return self.pool.pending
+
+    def error_output(self):
+        """Errors from chunk writers, encoders and the final join."""
+        return "\n".join(self._errors)
+
+    def release(self):
+        """Close the last chunk and queue it; finish() does the rest."""
+        self._close_chunk()
+        return not self._errors
+
+    def finish(self):
+        """Wait for the chunk encodes and join them into output_path."""
+        try:
+            chunks = self.pool.results()
+        except (RuntimeError, OSError) as e:
+            self._errors.append(str(e))
+            return False
+        if self._errors:
+            return False
+        if not chunks:
+            return True
+
+        try:
+            ok, log = join_segments(chunks, self.output_path)
+        except OSError as e:
+            ok, log = False, str(e)
+        if not ok:
+            self._errors.append(f"Joining segments failed: {log}")
+            return False
+        shutil.rmtree(self.chunk_dir, ignore_errors=True)
+        return True
+
+
+def join_segments(paths, output_path):
+    """
+    Concatenate chunk files with FFmpeg's concat demuxer (no re-encode).
+
+    Returns (success, FFmpeg log output).
+    """
+    output_path = Path(output_path)
+    list_path = output_path.with_name(output_path.stem + "_segments.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in paths:
+            # Single quotes are escaped as '\'' in concat lists
+            escaped = str(Path(path).resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    try:
+        result = subprocess.run(
+            [
+                "ffmpeg",
+                "-loglevel", "error",
+                "-f", "concat",
+                "-safe", "0",
+                "-i", str(list_path),
+                "-c", "copy",
+                "-y",
+                str(output_path)
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+    finally:
+        list_path.unlink()
+    return result.returncode == 0, result.stderr.strip()
@@ -0,0 +1,273 @@
+"""
+Crash-safe recording sessions and recovery.
+
+A crash-safe recording keeps its temporary files in a directory of its own
+with a session.json journal naming them, the recording settings and the
+state of the session:
+
+- "recording" while capturing,
+- "stopped" once the recorders have finished and the file is being saved.
+
+The directory is deleted once the recording has been saved (or discarded),
+so any session directory whose process is gone was left behind by a crash.
+The video in it is fragmented MP4 (see FFmpegPipeWriter) and the audio a
+WAV with a periodically patched header or a FLAC/Opus stream, all of which
+stay readable up to the point the process died.
+
+recover_session() rebuilds such a session into a Matroska file by copying
+the streams, never re-encoding them: Matroska takes H.264, PCM, FLAC and
+Opus as they are.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from recorder.core import Signal, Worker
+from recorder.probe import probe_media
+from recorder.segments import join_segments
+from recorder.wav_writer import repair_wav
+from utils.config import get_output_dir
+
+MANIFEST_NAME = "session.json"
+
+STATE_RECORDING = "recording"
+STATE_STOPPED = "stopped"
+
+
+def _pid_alive(pid):
+    """Whether a process with this id is still running."""
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill() would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Exists, owned by someone else
+    return True
+
+
+class SessionJournal:
+    """Directory and session.json manifest of one crash-safe recording."""
+
+    def __init__(self, directory, data=None):
+        self.directory = Path(directory)
+        self.data = data or {}
+
+    @classmethod
+    def create(cls, root, **info):
+        """Start a journal in a new directory under root."""
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        directory = tempfile.mkdtemp(prefix=f"session_{stamp}_", dir=root)
+        journal = cls(directory)
+        journal.update(state=STATE_RECORDING, started=time.time(), pid=os.getpid(), **info)
+        return journal
+
+    @classmethod
+    def load(cls, directory):
+        """Read an existing journal (OSError or ValueError if unreadable)."""
+        with open(Path(directory) / MANIFEST_NAME, encoding="utf-8") as f:
+            return cls(directory, json.load(f))
+
+    def path(self, name):
+        """Path of a file inside the session directory."""
+        return self.directory / name
+
+    @property
+    def state(self):
+        """STATE_RECORDING or STATE_STOPPED."""
+        return self.data.get("state")
+
+    @property
+    def orphaned(self):
+        """Whether the process that wrote this session has gone away."""
+        return not _pid_alive(self.data.get("pid", -1))
+
+    def update(self, **changes):
+        """Record changes; the manifest is replaced atomically."""
+        self.data.update(changes)
+        temp = self.path(MANIFEST_NAME + ".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.path(MANIFEST_NAME))
+
+    def discard(self):
+        """Delete the session directory and everything in it."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def find_orphaned_sessions(root):
+    """Journals under root left behind by processes that are gone, oldest first."""
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    sessions = []
+    for directory in sorted(root.iterdir()):
+        if not (directory / MANIFEST_NAME).exists():
+            continue
+        try:
+            journal = SessionJournal.load(directory)
+        except (OSError, ValueError):
+            continue
+        if journal.orphaned:
+            sessions.append(journal)
+    return sessions
+
+
+def recovery_path(journal):
+    """Where a recovered session is saved by default."""
+    output = journal.data.get("output")
+    if output:
+        output = Path(output)
+        return output.with_name(output.stem + ".recovered.mkv")
+    started = datetime.fromtimestamp(journal.data.get("started", time.time()))
+    return get_output_dir() / f"recovered_{started.strftime('%Y%m%d_%H%M%S')}.mkv"
+
+
+def _has_stream(path, kind):
+    """Whether path exists and FFmpeg can read a kind ("video"/"audio") stream."""
+    return path.exists() and path.stat().st_size > 0 and (
+        probe_media(path)[f"{kind}_codec"] is not None
+    )
+
+
+def _recover_video(journal):
+    """The session's video, joining its chunks first if it was segmented."""
+    data = journal.data
+    if data.get("segments"):
+        chunks = [
+            chunk for chunk in sorted(journal.path(data["segments"]).glob("chunk_*.mp4"))
+            if _has_stream(chunk, "video")
+        ]
+        if len(chunks) > 1:
+            joined = journal.path("recovered_video.mp4")
+            ok, log = join_segments(chunks, joined)
+            if not ok:
+                raise RuntimeError(f"Joining segments failed: {log}")
+            return joined
+        return chunks[0] if chunks else None
+    if data.get("video"):
+        video = journal.path(data["video"])
+        if _has_stream(video, "video"):
+            return video
+    return None
+
+
+def _recover_audio(journal):
+    """(path, title) of each readable audio file, the mix first."""
+    data = journal.data
+    files = [(data["audio"], "Mix")] if data.get("audio") else []
+    files += [tuple(track) for track in data.get("tracks", ())]
+    audio = []
+    for name, title in files:
+        path = journal.path(name)
+        if path.suffix == ".wav" and path.exists():
+            repair_wav(path)  # Header sizes lag the data after a crash
+        if _has_stream(path, "audio"):
+            audio.append((path, title))
+    return audio
+
+
+def recover_session(journal, output_path=None):
+    """
+    Assemble what an interrupted session left into a playable file.
+
+    Streams are copied, not re-encoded. The session directory is deleted
+    once the file is written. Returns the output path, or None when the
+    session held no media (it is discarded); raises RuntimeError when
+    FFmpeg fails.
+    """
+    output_path = Path(output_path or recovery_path(journal))
+    video = _recover_video(journal)
+    audio = _recover_audio(journal)
+    if video is None and not audio:
+        # Failed before writing anything: nothing to offer again
+        journal.discard()
+        return None
+
+    # Audio that started after the video is shifted as it was when saving
+    sync = journal.data.get("audio_sync") or {}
+    offset = round(sync.get("offset") or 0.0, 4)
+    if offset > 0:
+        shift = ["-itsoffset", str(offset)]
+    elif offset < 0:
+        shift = ["-ss", str(-offset)]
+    else:
+        shift = []
+
+    inputs = ["-i", str(video)] if video is not None else []
+    maps = ["-map", "0:v:0"] if video is not None else []
+    first_audio = 1 if video is not None else 0
+    for index, (path, title) in enumerate(audio):
+        inputs += [*shift, "-i", str(path)]
+        maps += [
+            "-map", f"{first_audio + index}:a:0",
+            f"-metadata:s:a:{index}", f"title={title}"
+        ]
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    result = subprocess.run(
+        [
+            "ffmpeg",
+            "-loglevel", "error",
+            *inputs,
+            *maps,
+            "-c", "copy",
+            "-y",
+            str(output_path)
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True
+    )
+    if result.returncode != 0 or not output_path.exists():
+        raise RuntimeError(f"FFmpeg could not rebuild the recording: {result.stderr.strip()}")
+    journal.discard()
+    return output_path
+
+
+class SessionRecovery(Worker):
+    """Recover several orphaned sessions on a background thread."""
+
+    def __init__(self, journals):
+        super().__init__()
+        self.session_recovered = Signal()  # (success, message)
+        self.recovery_finished = Signal()  # (number recovered, number failed)
+        self.journals = journals
+
+    def run(self):
+        recovered = failed = 0
+        for journal in self.journals:
+            try:
+                path = recover_session(journal)
+            except (RuntimeError, OSError) as e:
+                failed += 1
+                self.session_recovered.emit(False, str(e))
+            else:
+                if path is None:
+                    self.session_recovered.emit(
+                        True, f"Discarded {journal.directory.name}: nothing was recorded"
+                    )
+                    continue
+                recovered += 1
+                self.session_recovered.emit(True, f"Recovered recording saved to: {path}")
+        self.recovery_finished.emit(recovered, failed)
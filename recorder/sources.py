@@ -0,0 +1,288 @@
+"""
+Frame sources for the screen recorder.
+
+A frame source produces BGRA frames as (height, width, 4) uint8 arrays.
+ScreenRecorder opens the source on its capture thread and calls grab()
+once per output slot. Returned arrays are referenced by the pipeline without
+copying, so a source must not modify an array after returning it until the
+pipeline hands it back through recycle().
+
+Live sources (the screen) are paced by the wall clock; non-live sources
+(synthetic patterns, video files) run as fast as the pipeline allows, which
+makes them suitable for headless machines, CI and profiling.
+
+CompositeSource records several monitors or regions at once: each
+rectangle is grabbed on its own worker thread (with its own mss handle)
+and copied into one canvas, so only the requested pixels are captured and
+the grabs run in parallel. Canvases come from a pool allocated when the
+source opens and go back to it when the pipeline recycles them.
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import mss
+import cv2
+import numpy as np
+
+from recorder.pipeline import wrap_screenshot
+from utils.config import CAPTURE_LAYOUTS
+
+
+class FrameSource:
+    """Base class for frame sources."""
+
+    live = True  # Paced by the wall clock
+
+    def __init__(self):
+        self.width = 0
+        self.height = 0
+
+    @property
+    def size(self):
+        """Frame size as (width, height); valid once opened."""
+        return self.width, self.height
+
+    def open(self):
+        """Acquire resources; called on the capture thread."""
+
+    def grab(self):
+        """Return the next BGRA frame, or None when the source is exhausted."""
+        raise NotImplementedError
+
+    def recycle(self, frame):
+        """Take back a frame from grab() that the pipeline is done with."""
+
+    def close(self):
+        """Release resources."""
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class MssSource(FrameSource):
+    """Capture the screen (or a region of it) with mss."""
+
+    def __init__(self, region=None, monitor=1):
+        super().__init__()
+        self.region = region  # (x, y, width, height) or None for a whole monitor
+        self.monitor_index = monitor
+        self._sct = None
+        self._monitor = None
+
+    def open(self):
+        # mss handles are bound to the thread that created them
+        self._sct = mss.mss()
+        if self.region:
+            self._monitor = {
+                "left": self.region[0],
+                "top": self.region[1],
+                "width": self.region[2],
+                "height": self.region[3]
+            }
+        else:
+            self._monitor = self._sct.monitors[self.monitor_index]
+        self.width = self._monitor["width"]
+        self.height = self._monitor["height"]
+
+    def grab(self):
+        return wrap_screenshot(self._sct.grab(self._monitor))
+
+    def close(self):
+        if self._sct:
+            self._sct.close()
+            self._sct = None
+
+
+class CompositeSource(FrameSource):
+    """Grab several monitors or regions in parallel into one canvas."""
+
+    LAYOUTS = CAPTURE_LAYOUTS
+
+    def __init__(self, regions=None, layout="row", workers=None, canvases=10):
+        super().__init__()
+        if layout not in self.LAYOUTS:
+            raise ValueError(f"Unknown composite layout: {layout}")
+        # Monitor indices (as in mss.monitors) or (x, y, width, height)
+        # tuples; None records every monitor
+        self.regions = list(regions) if regions else None
+        self.layout = layout  # row: side by side; desktop: keep arrangement
+        self.workers = workers
+        # Canvases allocated up front; at least the frame ring size plus
+        # two, so the pool is not exhausted while the ring holds frames
+        self.canvases = canvases
+        self._placements = []  # (monitor dict, canvas y, canvas x)
+        self._free = deque()  # Canvases no stage is using
+        self._executor = None
+        self._local = threading.local()
+        self._handles = []
+        self._handles_lock = threading.Lock()
+
+    def open(self):
+        with mss.mss() as sct:
+            regions = self.regions or range(1, len(sct.monitors))
+            monitors = [self._resolve(sct, region) for region in regions]
+
+        if self.layout == "desktop":
+            # Keep the on-screen arrangement within the bounding box
+            left = min(m["left"] for m in monitors)
+            top = min(m["top"] for m in monitors)
+            self._placements = [(m, m["top"] - top, m["left"] - left) for m in monitors]
+        else:
+            x = 0
+            self._placements = []
+            for monitor in monitors:
+                self._placements.append((monitor, 0, x))
+                x += monitor["width"]
+
+        self.width = max(x + m["width"] for m, _, x in self._placements)
+        self.height = max(y + m["height"] for m, y, _ in self._placements)
+        # Zeroed once: gaps between regions stay black, regions are overwritten
+        self._free = deque(self._new_canvas() for _ in range(self.canvases))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers or len(self._placements),
+            thread_name_prefix="capture"
+        )
+
+    @staticmethod
+    def _resolve(sct, region):
+        """Turn a monitor index or region tuple into an mss monitor dict."""
+        if isinstance(region, int):
+            return dict(sct.monitors[region])
+        x, y, width, height = region
+        return {"left": x, "top": y, "width": width, "height": height}
+
+    def _handle(self):
+        """Per-thread mss handle (mss handles are bound to their thread)."""
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = mss.mss()
+            with self._handles_lock:
+                self._handles.append(sct)
+        return sct
+
+    def _grab_into(self, canvas, monitor, y, x):
+        shot = wrap_screenshot(self._handle().grab(monitor))
+        canvas[y:y + shot.shape[0], x:x + shot.shape[1]] = shot
+
+    def _new_canvas(self):
+        return np.zeros((self.height, self.width, 4), dtype=np.uint8)
+
+    def grab(self):
+        try:
+            canvas = self._free.popleft()
+        except IndexError:
+            # Every canvas is still in the pipeline (recycle() not wired up)
+            canvas = self._new_canvas()
+        futures = [
+            self._executor.submit(self._grab_into, canvas, *placement)
+            for placement in self._placements
+        ]
+        for future in futures:
+            future.result()
+        return canvas
+
+    def recycle(self, frame):
+        # deque appends are thread-safe; called from the convert stage
+        self._free.append(frame)
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._free.clear()
+        with self._handles_lock:
+            for sct in self._handles:
+                sct.close()
+            self._handles = []
+
+
+class SyntheticSource(FrameSource):
+    """Generated frames for running without a display."""
+
+    PATTERNS = ("moving", "static", "noise")
+
+    def __init__(self, width=1920, height=1080, pattern="moving", variants=16,
+                 live=False):
+        super().__init__()
+        if pattern not in self.PATTERNS:
+            raise ValueError(f"Unknown synthetic pattern: {pattern}")
+        self.width = width
+        self.height = height
+        self.pattern = pattern
+        self.variants = variants
+        self.live = live
+        self._frames = []
+        self._index = 0
+
+    def open(self):
+        """Pregenerate the frames so grab() costs nothing."""
+        width, height = self.width, self.height
+        rng = np.random.default_rng(0)
+
+        if self.pattern == "noise":
+            frames = [
+                rng.integers(0, 255, (height, width, 4), dtype=np.uint8)
+                for _ in range(self.variants)
+            ]
+        else:
+            base = np.zeros((height, width, 4), dtype=np.uint8)
+            base[..., 0] = np.linspace(0, 255, width, dtype=np.uint8)
+            base[..., 3] = 255
+            if self.pattern == "static":
+                frames = [base]
+            else:
+                # A bar sweeping across the gradient
+                frames = []
+                bar = max(1, width // self.variants)
+                for i in range(self.variants):
+                    frame = base.copy()
+                    frame[:, i * bar:(i + 1) * bar, 1:3] = 255
+                    frames.append(frame)
+
+        for frame in frames:
+            frame.flags.writeable = False
+        self._frames = frames
+        self._index = 0
+
+    def grab(self):
+        frame = self._frames[self._index % len(self._frames)]
+        self._index += 1
+        return frame
+
+
+class FileSource(FrameSource):
+    """Replay frames from a video file."""
+
+    def __init__(self, path, loop=False, live=False):
+        super().__init__()
+        self.path = str(path)
+        self.loop = loop
+        self.live = live
+        self._capture = None
+
+    def open(self):
+        self._capture = cv2.VideoCapture(self.path)
+        if not self._capture.isOpened():
+            raise IOError(f"Cannot open video file: {self.path}")
+        self.width = int(self._capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self._capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def grab(self):
+        ok, frame = self._capture.read()
+        if not ok and self.loop:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._capture.read()
+        if not ok:
+            return None
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+
+    def close(self):
+        if self._capture:
+            self._capture.release()
+            self._capture = None
@@ -0,0 +1,150 @@
+"""
+Audio/video clock synchronization.
+
+Both recorders measure time on the same monotonic clock. ScreenRecorder
+places frame n at epoch + n / fps, and AudioRecorder records when each
+audio block arrived. From those timestamps AudioClock estimates:
+
+- the offset of the first audio sample from the video epoch (the two
+  threads and devices never start at exactly the same moment), and
+- the rate at which the device really delivered samples. Sound card
+  clocks are off by tens to hundreds of ppm, which adds up to seconds of
+  drift over a long recording.
+
+VideoEncoder turns both into FFmpeg options at mux time (see audio_sync()
+and VideoEncoder._audio_sync_args()).
+"""
+import time
+
+import numpy as np
+
+# Drift is estimated from the block arrival times, which jitter by a few
+# milliseconds; below these limits a correction would only add noise
+MIN_DRIFT_SECONDS = 10.0
+MIN_DRIFT_PPM = 50
+MAX_DRIFT_PPM = 20000  # Beyond 2% the measurement, not the clock, is wrong
+
+
+class AudioClock:
+    """
+    Capture time and running sample count of audio blocks.
+
+    Marks go into two preallocated arrays, so the audio callback never
+    allocates. When they fill up every other mark is dropped and only
+    every second block is marked from then on: the fit keeps spanning the
+    whole recording with at most MAX_MARKS points.
+    """
+
+    MAX_MARKS = 4096
+
+    def __init__(self, sample_rate, clock=time.monotonic):
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.start = None  # Clock time of the first sample (None before any audio)
+        self.blocks = 0
+        self._arrivals = np.empty(self.MAX_MARKS)  # Clock time of a block's first sample
+        self._samples = np.empty(self.MAX_MARKS, dtype=np.int64)  # Frames before it
+        self._count = 0
+        self._stride = 1  # Blocks between marks
+        self._generation = 0  # Bumped around each thinning, for readers
+        self._total = 0
+
+    def mark(self, frames, latency=None):
+        """
+        Record a block of frames that has just been delivered.
+
+        latency is how long ago its first sample was captured, as reported
+        by the device; without it the block is assumed to have just ended.
+        """
+        if latency is None:
+            latency = frames / self.sample_rate
+        arrival = self.clock() - latency
+        if self.start is None:
+            self.start = arrival
+        # Called from the audio callback: no lock and no allocation
+        if self.blocks % self._stride == 0:
+            if self._count == self.MAX_MARKS:
+                self._thin()
+            self._arrivals[self._count] = arrival
+            self._samples[self._count] = self._total
+            self._count += 1
+        self.blocks += 1
+        self._total += frames
+
+    def _thin(self):
+        """Keep every other mark and halve the marking rate."""
+        self._generation += 1
+        half = self.MAX_MARKS // 2
+        # In place, in ranges [n, 2n) that each read only from [2n, 4n),
+        # so no slice overlaps what it reads and NumPy needs no temporary
+        n = 1
+        while n < half:
+            self._arrivals[n:2 * n] = self._arrivals[2 * n:4 * n:2]
+            self._samples[n:2 * n] = self._samples[2 * n:4 * n:2]
+            n *= 2
+        self._count = half
+        self._stride *= 2
+        self._generation += 1
+
+    def marks(self):
+        """Copies of (arrival times, sample counts), consistent with each other."""
+        while True:
+            generation = self._generation
+            count = self._count
+            arrivals = self._arrivals[:count].copy()
+            samples = self._samples[:count].copy()
+            # Retry if the callback thinned the arrays meanwhile
+            if generation % 2 == 0 and generation == self._generation:
+                return arrivals, samples
+
+    def measured_rate(self):
+        """
+        Sample rate the device actually delivered, fitted over all blocks.
+
+        Returns the nominal rate for recordings too short to measure.
+        """
+        arrivals, samples = self.marks()
+        if len(arrivals) < 2 or arrivals[-1] - arrivals[0] < MIN_DRIFT_SECONDS:
+            return float(self.sample_rate)
+        # Least squares is far less sensitive to callback jitter than two points
+        slope = np.polyfit(arrivals - arrivals[0], samples.astype(np.float64), 1)[0]
+        return float(slope)
+
+    def snapshot(self, epoch=None):
+        """Offset from epoch, measured rate and drift in ppm."""
+        rate = self.measured_rate()
+        start = self.start
+        return {
+            "offset": start - epoch if start is not None and epoch is not None else None,
+            "nominal_rate": self.sample_rate,
+            "measured_rate": rate,
+            "drift_ppm": (rate / self.sample_rate - 1) * 1e6,
+            "blocks": self.blocks,
+        }
+
+
+def audio_sync(screen_recorder, audio_recorder):
+    """
+    Offset and rate correction for muxing a recording's audio.
+
+    Returns {"offset": seconds, "rate": measured samples per second,
+    "nominal_rate": samples per second in the file} for
+    VideoEncoder(audio_sync=...), or None when there is nothing to correct
+    against. A positive offset means the audio started after the video.
+    """
+    if screen_recorder is None or audio_recorder is None:
+        return None
+    epoch = screen_recorder.epoch
+    info = audio_recorder.clock.snapshot(epoch)
+    if info["offset"] is None:
+        return None
+    rate = info["measured_rate"]
+    if not MIN_DRIFT_PPM <= abs(info["drift_ppm"]) <= MAX_DRIFT_PPM:
+        rate = info["nominal_rate"]
+    # The master device may run at another rate than the mixed file
+    scale = audio_recorder.sample_rate / info["nominal_rate"]
+    return {
+        "offset": info["offset"],
+        "rate": rate * scale,
+        "nominal_rate": audio_recorder.sample_rate,
+    }
@@ -0,0 +1,122 @@
+"""
+Thin Qt adapters around the pure-Python recording engine.
+
+Engine objects report through recorder.core.Signal callbacks on their own
+threads. Each adapter re-emits those callbacks as pyqtSignals, which Qt
+queues to the GUI thread, and forwards every other attribute to the
+wrapped object, so the window can use them like the engine classes.
+"""
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class QtAdapter(QObject):
+    """Forward an engine object's callbacks to same-named Qt signals."""
+
+    SIGNALS = ()  # Names of the Signal attributes to forward
+
+    def __init__(self, core, parent=None):
+        super().__init__(parent)
+        self.core = core
+        for name in self.SIGNALS:
+            getattr(core, name).connect(getattr(self, name).emit)
+
+    def __getattr__(self, name):
+        # Only reached for attributes the adapter itself does not have
+        if name == "core":
+            raise AttributeError(name)
+        return getattr(self.core, name)
+
+
+class QtScreenRecorder(QtAdapter):
+    """Qt signals for recorder.screen_recorder.ScreenRecorder."""
+
+    error_occurred = pyqtSignal(str)
+    stats_updated = pyqtSignal(dict)
+    SIGNALS = ("error_occurred", "stats_updated")
+
+
+class QtAudioRecorder(QtAdapter):
+    """Qt signals for recorder.audio_recorder.AudioRecorder."""
+
+    error_occurred = pyqtSignal(str)
+    stats_updated = pyqtSignal(dict)
+    SIGNALS = ("error_occurred", "stats_updated")
+
+
+class QtVideoEncoder(QtAdapter):
+    """Qt signals for recorder.encoder.VideoEncoder."""
+
+    progress_updated = pyqtSignal(str)
+    progress_stats = pyqtSignal(dict)
+    encoding_finished = pyqtSignal(bool, str)
+    SIGNALS = ("progress_updated", "progress_stats", "encoding_finished")
+
+
+class QtReplaySaver(QtAdapter):
+    """Qt signals for recorder.replay.ReplaySaver."""
+
+    save_finished = pyqtSignal(bool, str)
+    SIGNALS = ("save_finished",)
+
+
+class QtPreviewChannel(QtAdapter):
+    """
+    Qt signals for recorder.preview.PreviewChannel.
+
+    The channel only downscales frames while someone listens, so the
+    callback is connected only while the Qt signal has receivers.
+    """
+
+    frame_ready = pyqtSignal(object)
+
+    def __init__(self, core, parent=None):
+        super().__init__(core, parent)
+        self._forward = None  # Our callback on the core, while connected
+
+    @staticmethod
+    def _is_frame_ready(signal):
+        # PyQt5 has no QMetaMethod.fromSignal(); the name identifies it
+        return bytes(signal.name()) == b"frame_ready"
+
+    def connectNotify(self, signal):
+        if self._is_frame_ready(signal) and self._forward is None:
+            self._forward = self.frame_ready.emit
+            self.core.frame_ready.connect(self._forward)
+
+    def disconnectNotify(self, signal):
+        # An invalid method means every connection was dropped at once
+        if (not signal.isValid() or self._is_frame_ready(signal)) and (
+                self._forward is not None and self.receivers(self.frame_ready) == 0):
+            # Leave any other subscribers of the core alone
+            self.core.frame_ready.disconnect(self._forward)
+            self._forward = None
+
+
+class QtDeviceProbe(QtAdapter):
+    """Qt signals for recorder.devices.DeviceProbe."""
+
+    probed = pyqtSignal(dict)
+    SIGNALS = ("probed",)
+
+
+class QtSessionRecovery(QtAdapter):
+    """Qt signals for recorder.session.SessionRecovery."""
+
+    session_recovered = pyqtSignal(bool, str)
+    recovery_finished = pyqtSignal(int, int)
+    SIGNALS = ("session_recovered", "recovery_finished")
+
+
+class QtCountdownTimer(QtAdapter):
+    """Qt signals for utils.timer.CountdownTimer."""
+
+    tick = pyqtSignal(int)
+    finished = pyqtSignal()
+    SIGNALS = ("tick", "finished")
+
+
+class QtRecordingTimer(QtAdapter):
+    """Qt signals for utils.timer.RecordingTimer."""
+
+    time_updated = pyqtSignal(str)
+    SIGNALS = ("time_updated",)
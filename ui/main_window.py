@@ -1,25 +1,47 @@
 """
 Main window for screen recorder application.
 """
+import time
+
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QCheckBox, QComboBox,
-    QFileDialog, QMessageBox, QGroupBox, QSpinBox
+    QFileDialog, QMessageBox, QGroupBox, QSpinBox, QProgressBar
 )
 from PyQt5.QtCore import Qt, pyqtSlot
 from PyQt5.QtGui import QFont, QPalette, QColor
 
-from recorder.screen_recorder import ScreenRecorder
-from recorder.audio_recorder import AudioRecorder
-from recorder.encoder import VideoEncoder
+# The recorder modules pull in OpenCV, NumPy, mss and sounddevice, so they
+# are imported where they are first used rather than at startup
+from recorder.devices import DeviceProbe
 from utils.timer import CountdownTimer, RecordingTimer
 from utils.hotkeys import HotkeyHandler
+from ui.adapters import (
+    QtScreenRecorder, QtAudioRecorder, QtVideoEncoder, QtReplaySaver,
+    QtPreviewChannel, QtCountdownTimer, QtRecordingTimer, QtDeviceProbe,
+    QtSessionRecovery
+)
 from utils.config import (
     APP_NAME, DEFAULT_FPS, get_temp_video_path,
-    get_temp_audio_path, get_output_path, check_ffmpeg,
-    COUNTDOWN_SECONDS, HOTKEY_START, HOTKEY_STOP
+    get_temp_audio_path, get_output_path,
+    COUNTDOWN_SECONDS, HOTKEY_START, HOTKEY_STOP, HOTKEY_SAVE_REPLAY,
+    FRAME_RING_SIZE, FRAME_RING_POLICY, CAPTURE_LAYOUT, CAPTURE_WORKERS,
+    STREAMING_ENCODE, STREAM_PRESET, STREAM_CRF,
+    ENCODER_THREADS, ENCODER_TUNE, ENCODER_BITRATE, ENCODER_GOP,
+    ENCODER_PIX_FMT, ENCODER_NICE, ENCODER_CPU_AFFINITY,
+    SKIP_UNCHANGED_FRAMES, DEFAULT_VFR,
+    SHOW_PREVIEW, PREVIEW_FPS, PREVIEW_SIZE,
+    SEGMENTED_RECORDING, SEGMENT_SECONDS, SEGMENT_WORKERS,
+    REPLAY_SECONDS, REPLAY_MAX_MB, REPLAY_JPEG_QUALITY, get_replay_path,
+    METRICS_SIDECAR, METRICS_HOST, METRICS_PORT,
+    DEFAULT_ENCODE_PROFILE, ENCODE_PROFILE_LABELS, AV_SYNC_CORRECTION,
+    AUDIO_FORMAT, AUDIO_OPUS_BITRATE,
+    AUDIO_BLOCKSIZE, AUDIO_LATENCY, AUDIO_RING_SECONDS,
+    AUDIO_SOURCES, AUDIO_LOOPBACK_GAIN, AUDIO_SEPARATE_TRACKS,
+    CRASH_SAFE_RECORDING, FRAGMENT_SECONDS, SESSIONS_DIR, get_sessions_dir
 )
 from ui.region_selector import RegionSelector
+from ui.preview_widget import PreviewWidget
 
 
 class MainWindow(QMainWindow):
@@ -33,30 +55,46 @@ class MainWindow(QMainWindow):
         # Recording state
         self.is_recording = False
         self.selected_region = None
+        self.selected_regions = []  # Multiple Regions mode
         
         # Recorder instances
         self.screen_recorder = None
+        self.preview_channel = None
         self.audio_recorder = None
         self.encoder = None
         self.countdown_timer = None
         self.recording_timer = None
         self.hotkey_handler = None
-        
-        # Check FFmpeg
-        if not check_ffmpeg():
-            QMessageBox.warning(
-                self,
-                "FFmpeg Not Found",
-                "FFmpeg is not installed or not in PATH.\n"
-                "Audio and video will not be merged properly.\n"
-                "Please install FFmpeg for full functionality."
-            )
+        self.streaming = False
+        self.segmented = False
+        self.replay_mode = False
+        self.audio_format = AUDIO_FORMAT
+        self.session = None  # Journal of the current crash-safe recording
+        self.session_recovery = None
+        self.recovery_messages = []
+        self.replay_savers = []
+        self.session_summary = ""
+        
+        # Filled in by the background device probe
+        self.devices_probed = False
+        self.ffmpeg_available = False
+        self.microphone_available = False
+        self.loopback_device = None  # Input that records system audio
+        self.device_probe = None
         
         # Initialize UI
         self._init_ui()
         
+        # Look for FFmpeg and a microphone without blocking the window
+        self._probe_devices()
+        
         # Start hotkey handler
         self._init_hotkeys()
+        
+        # Live metrics endpoint
+        self.metrics_server = None
+        if METRICS_PORT is not None:
+            self._init_metrics_server()
     
     def _init_ui(self):
         """Initialize user interface."""
@@ -87,6 +125,14 @@ class MainWindow(QMainWindow):
         self.fps_spinbox.setRange(10, 60)
         self.fps_spinbox.setValue(DEFAULT_FPS)
         fps_layout.addWidget(self.fps_spinbox)
+        
+        # Variable frame rate needs the FFmpeg streaming encoder
+        self.vfr_checkbox = QCheckBox("Variable frame rate")
+        self.vfr_checkbox.setToolTip(
+            "Only encode frames that changed; FPS becomes the maximum rate"
+        )
+        self.vfr_checkbox.setEnabled(False)  # Until FFmpeg is found
+        fps_layout.addWidget(self.vfr_checkbox)
         fps_layout.addStretch()
         settings_layout.addLayout(fps_layout)
         
@@ -94,11 +140,29 @@ class MainWindow(QMainWindow):
         mode_layout = QHBoxLayout()
         mode_layout.addWidget(QLabel("Screen Mode:"))
         self.mode_combo = QComboBox()
-        self.mode_combo.addItems(["Full Screen", "Selected Region"])
+        self.mode_combo.addItems(
+            ["Full Screen", "Selected Region", "Multiple Regions", "All Monitors"]
+        )
         mode_layout.addWidget(self.mode_combo)
         mode_layout.addStretch()
         settings_layout.addLayout(mode_layout)
         
+        # Encode profile used when saving
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("Save Profile:"))
+        self.profile_combo = QComboBox()
+        for profile, label in ENCODE_PROFILE_LABELS.items():
+            self.profile_combo.addItem(label, profile)
+        self.profile_combo.setCurrentIndex(
+            self.profile_combo.findData(DEFAULT_ENCODE_PROFILE)
+        )
+        self.profile_combo.setToolTip(
+            "Copy and Fast keep H.264 video as it is; Quality always re-encodes it"
+        )
+        profile_layout.addWidget(self.profile_combo)
+        profile_layout.addStretch()
+        settings_layout.addLayout(profile_layout)
+        
         # Select region button
         self.select_region_btn = QPushButton("Select Region")
         self.select_region_btn.clicked.connect(self._select_region)
@@ -111,14 +175,21 @@ class MainWindow(QMainWindow):
         # Audio recording checkbox
         self.audio_checkbox = QCheckBox("Record Microphone Audio")
         self.audio_checkbox.setChecked(True)
+        self.audio_checkbox.setEnabled(False)  # Until a microphone is found
+        settings_layout.addWidget(self.audio_checkbox)
         
-        # Check if microphone is available
-        if not AudioRecorder.check_microphone():
-            self.audio_checkbox.setEnabled(False)
-            self.audio_checkbox.setChecked(False)
-            self.audio_checkbox.setText("Record Microphone Audio (No microphone detected)")
+        # System audio through a monitor/loopback input, mixed with the mic
+        self.system_audio_checkbox = QCheckBox("Record System Audio")
+        self.system_audio_checkbox.setEnabled(False)  # Until a loopback input is found
+        settings_layout.addWidget(self.system_audio_checkbox)
         
-        settings_layout.addWidget(self.audio_checkbox)
+        # Replay buffer: keep the last N seconds in memory, save on demand
+        self.replay_checkbox = QCheckBox(
+            f"Replay buffer (keep last {REPLAY_SECONDS}s, save with "
+            f"{HOTKEY_SAVE_REPLAY.upper()})"
+        )
+        self.replay_checkbox.setEnabled(False)  # Until FFmpeg is found
+        settings_layout.addWidget(self.replay_checkbox)
         
         main_layout.addWidget(settings_group)
         
@@ -128,7 +199,7 @@ class MainWindow(QMainWindow):
         status_group.setLayout(status_layout)
         
         # Recording status indicator
-        self.status_label = QLabel("⚫ Ready")
+        self.status_label = QLabel("⏳ Checking devices...")
         self.status_label.setAlignment(Qt.AlignCenter)
         status_font = QFont()
         status_font.setPointSize(14)
@@ -144,14 +215,43 @@ class MainWindow(QMainWindow):
         self.timer_label.setFont(timer_font)
         status_layout.addWidget(self.timer_label)
         
+        # Encoding progress (shown while FFmpeg finalizes the recording)
+        encode_layout = QHBoxLayout()
+        self.encode_progress = QProgressBar()
+        self.encode_progress.setRange(0, 100)
+        self.encode_progress.setVisible(False)
+        encode_layout.addWidget(self.encode_progress)
+        
+        self.cancel_encode_btn = QPushButton("Cancel")
+        self.cancel_encode_btn.clicked.connect(self._cancel_encoding)
+        self.cancel_encode_btn.setVisible(False)
+        encode_layout.addWidget(self.cancel_encode_btn)
+        status_layout.addLayout(encode_layout)
+        
         main_layout.addWidget(status_group)
         
+        # Preview group
+        preview_group = QGroupBox("Preview")
+        preview_layout = QVBoxLayout()
+        preview_group.setLayout(preview_layout)
+        
+        self.preview_checkbox = QCheckBox("Show live preview")
+        self.preview_checkbox.setChecked(SHOW_PREVIEW)
+        self.preview_checkbox.toggled.connect(self._on_preview_toggled)
+        preview_layout.addWidget(self.preview_checkbox)
+        
+        self.preview_widget = PreviewWidget()
+        preview_layout.addWidget(self.preview_widget, alignment=Qt.AlignCenter)
+        
+        main_layout.addWidget(preview_group)
+        
         # Control buttons
         button_layout = QHBoxLayout()
         
         self.start_btn = QPushButton("🔴 Start Recording")
         self.start_btn.setMinimumHeight(50)
         self.start_btn.clicked.connect(self._start_recording)
+        self.start_btn.setEnabled(False)  # Until the device probe finishes
         self.start_btn.setStyleSheet(
             "QPushButton { background-color: #28a745; color: white; font-size: 14px; font-weight: bold; }"
             "QPushButton:hover { background-color: #218838; }"
@@ -168,11 +268,18 @@ class MainWindow(QMainWindow):
         )
         button_layout.addWidget(self.stop_btn)
         
+        self.save_replay_btn = QPushButton("💾 Save Replay")
+        self.save_replay_btn.setMinimumHeight(50)
+        self.save_replay_btn.clicked.connect(self._save_replay)
+        self.save_replay_btn.setEnabled(False)
+        button_layout.addWidget(self.save_replay_btn)
+        
         main_layout.addLayout(button_layout)
         
         # Hotkey info
         hotkey_info = QLabel(
-            f"Hotkeys: {HOTKEY_START.upper()} (Start) | {HOTKEY_STOP.upper()} (Stop)"
+            f"Hotkeys: {HOTKEY_START.upper()} (Start) | {HOTKEY_STOP.upper()} (Stop) | "
+            f"{HOTKEY_SAVE_REPLAY.upper()} (Save Replay)"
         )
         hotkey_info.setAlignment(Qt.AlignCenter)
         hotkey_info.setStyleSheet("color: gray; font-size: 10px;")
@@ -180,25 +287,139 @@ class MainWindow(QMainWindow):
         
         main_layout.addStretch()
     
+    def _on_preview_toggled(self, checked):
+        """Connect or disconnect the live preview."""
+        if checked and self.is_recording and self.screen_recorder:
+            self.preview_widget.attach(self.preview_channel)
+        else:
+            self.preview_widget.detach()
+            self.preview_widget.clear_preview()
+    
+    def _can_use_vfr(self):
+        """VFR recording requires the FFmpeg streaming encoder and one file."""
+        return STREAMING_ENCODE and self.ffmpeg_available and not SEGMENTED_RECORDING
+    
+    def _probe_devices(self):
+        """Check for FFmpeg and a microphone on a background thread."""
+        self.device_probe = QtDeviceProbe(DeviceProbe())
+        self.device_probe.probed.connect(self._on_devices_probed)
+        self.device_probe.start()
+    
+    @pyqtSlot(dict)
+    def _on_devices_probed(self, results):
+        """Enable the features the probed tools and devices allow."""
+        self.devices_probed = True
+        self.ffmpeg_available = results["ffmpeg"]
+        self.microphone_available = results["microphone"]
+        self.loopback_device = results["loopback"]
+        
+        if not self.microphone_available:
+            self.audio_checkbox.setChecked(False)
+            self.audio_checkbox.setText("Record Microphone Audio (No microphone detected)")
+        if self.loopback_device is None:
+            self.system_audio_checkbox.setText("Record System Audio (No loopback input found)")
+        else:
+            self.system_audio_checkbox.setToolTip(f"Records from {self.loopback_device}")
+        self.vfr_checkbox.setChecked(DEFAULT_VFR and self._can_use_vfr())
+        
+        if not self.is_recording:
+            self._reset_ui()
+        
+        if self.ffmpeg_available and CRASH_SAFE_RECORDING:
+            self._offer_recovery()
+        
+        if not self.ffmpeg_available:
+            QMessageBox.warning(
+                self,
+                "FFmpeg Not Found",
+                "FFmpeg is not installed or not in PATH.\n"
+                "Audio and video will not be merged properly.\n"
+                "Please install FFmpeg for full functionality."
+            )
+    
+    def _offer_recovery(self):
+        """Offer to rebuild recordings a crash left behind."""
+        from recorder.session import SessionRecovery, find_orphaned_sessions
+        
+        sessions = find_orphaned_sessions(SESSIONS_DIR)
+        if not sessions:
+            return
+        reply = QMessageBox.question(
+            self,
+            "Recover Recordings",
+            f"{len(sessions)} recording(s) were interrupted before they were saved.\n"
+            "Recover them now? They are saved as MKV files in the output folder\n"
+            "without re-encoding.",
+            QMessageBox.Yes | QMessageBox.No | QMessageBox.Discard,
+            QMessageBox.Yes
+        )
+        if reply == QMessageBox.Discard:
+            for journal in sessions:
+                journal.discard()
+        elif reply == QMessageBox.Yes:
+            self.recovery_messages = []
+            self.session_recovery = QtSessionRecovery(SessionRecovery(sessions))
+            self.session_recovery.session_recovered.connect(self._on_session_recovered)
+            self.session_recovery.recovery_finished.connect(self._on_recovery_finished)
+            self.statusBar().showMessage("Recovering interrupted recordings...")
+            self.session_recovery.start()
+    
+    @pyqtSlot(bool, str)
+    def _on_session_recovered(self, success, message):
+        """Collect the outcome of one recovered session."""
+        self.recovery_messages.append(message if success else f"Failed: {message}")
+    
+    @pyqtSlot(int, int)
+    def _on_recovery_finished(self, recovered, failed):
+        """Report the recovered recordings."""
+        self.statusBar().clearMessage()
+        message = "\n".join(self.recovery_messages)
+        if failed:
+            QMessageBox.warning(self, "Recovery", message)
+        else:
+            QMessageBox.information(self, "Recovery", message)
+    
     def _init_hotkeys(self):
         """Initialize global hotkeys."""
-        self.hotkey_handler = HotkeyHandler(HOTKEY_START, HOTKEY_STOP)
+        self.hotkey_handler = HotkeyHandler(HOTKEY_START, HOTKEY_STOP, HOTKEY_SAVE_REPLAY)
         self.hotkey_handler.start_recording.connect(self._start_recording)
         self.hotkey_handler.stop_recording.connect(self._stop_recording)
+        self.hotkey_handler.save_replay.connect(self._save_replay)
         self.hotkey_handler.start()
     
+    def _init_metrics_server(self):
+        """Serve live session metrics for Prometheus-style scrapers."""
+        from recorder.metrics import MetricsServer
+        
+        try:
+            self.metrics_server = MetricsServer(
+                self._session_metrics, METRICS_HOST, METRICS_PORT
+            )
+            self.metrics_server.start()
+        except OSError as e:
+            self.metrics_server = None
+            print(f"Metrics endpoint error: {e}")
+    
+    def _session_metrics(self):
+        """Metrics of the current (or last) recording session."""
+        from recorder.metrics import session_metrics
+        
+        return session_metrics(self.screen_recorder, self.audio_recorder, self.encoder)
+    
     def _on_mode_changed(self, mode):
         """Handle screen mode change."""
-        if mode == "Selected Region":
+        if mode in ("Selected Region", "Multiple Regions"):
             self.select_region_btn.setEnabled(True)
         else:
             self.select_region_btn.setEnabled(False)
             self.selected_region = None
+            self.selected_regions = []
     
     def _select_region(self):
         """Open region selector."""
-        selector = RegionSelector()
+        selector = RegionSelector(multi=self.mode_combo.currentText() == "Multiple Regions")
         selector.region_selected.connect(self._on_region_selected)
+        selector.regions_selected.connect(self._on_regions_selected)
         selector.show()
         selector.activateWindow()
     
@@ -212,10 +433,39 @@ class MainWindow(QMainWindow):
             f"Selected region: {region[2]}x{region[3]} at ({region[0]}, {region[1]})"
         )
     
+    @pyqtSlot(list)
+    def _on_regions_selected(self, regions):
+        """Handle selection of several regions."""
+        self.selected_regions = regions
+        QMessageBox.information(
+            self,
+            "Regions Selected",
+            "Selected regions:\n" + "\n".join(
+                f"{w}x{h} at ({x}, {y})" for x, y, w, h in regions
+            )
+        )
+    
+    def _capture_source(self):
+        """Frame source for the multi-region modes (None = ScreenRecorder default)."""
+        from recorder.sources import CompositeSource
+        
+        mode = self.mode_combo.currentText()
+        if mode == "Multiple Regions":
+            return CompositeSource(
+                self.selected_regions, CAPTURE_LAYOUT, CAPTURE_WORKERS,
+                canvases=FRAME_RING_SIZE + 2
+            )
+        if mode == "All Monitors":
+            # Each monitor is grabbed separately, without the gaps between them
+            return CompositeSource(
+                None, "desktop", CAPTURE_WORKERS, canvases=FRAME_RING_SIZE + 2
+            )
+        return None
+    
     @pyqtSlot()
     def _start_recording(self):
         """Start recording with countdown."""
-        if self.is_recording:
+        if self.is_recording or not self.devices_probed:
             return
         
         # Validate region selection
@@ -226,16 +476,26 @@ class MainWindow(QMainWindow):
                 "Please select a screen region first."
             )
             return
+        if self.mode_combo.currentText() == "Multiple Regions" and not self.selected_regions:
+            QMessageBox.warning(
+                self,
+                "No Regions Selected",
+                "Please select the screen regions first."
+            )
+            return
         
         # Update UI
         self.start_btn.setEnabled(False)
         self.mode_combo.setEnabled(False)
         self.select_region_btn.setEnabled(False)
         self.audio_checkbox.setEnabled(False)
+        self.system_audio_checkbox.setEnabled(False)
         self.fps_spinbox.setEnabled(False)
+        self.vfr_checkbox.setEnabled(False)
+        self.replay_checkbox.setEnabled(False)
         
         # Start countdown
-        self.countdown_timer = CountdownTimer(COUNTDOWN_SECONDS)
+        self.countdown_timer = QtCountdownTimer(CountdownTimer(COUNTDOWN_SECONDS))
         self.countdown_timer.tick.connect(self._on_countdown_tick)
         self.countdown_timer.finished.connect(self._start_actual_recording)
         self.countdown_timer.start()
@@ -248,10 +508,17 @@ class MainWindow(QMainWindow):
     @pyqtSlot()
     def _start_actual_recording(self):
         """Start actual recording after countdown."""
+        from recorder.screen_recorder import ScreenRecorder
+        
         self.is_recording = True
+        self.replay_mode = self.replay_checkbox.isChecked()
         
         # Update UI
-        self.status_label.setText("🔴 Recording")
+        if self.replay_mode:
+            self.status_label.setText("🔁 Replay buffer")
+            self.save_replay_btn.setEnabled(True)
+        else:
+            self.status_label.setText("🔴 Recording")
         self.status_label.setStyleSheet("color: red;")
         self.stop_btn.setEnabled(True)
         
@@ -263,24 +530,127 @@ class MainWindow(QMainWindow):
         if self.mode_combo.currentText() == "Selected Region":
             region = self.selected_region
         
+        # Stream straight into FFmpeg when possible, else two-pass via OpenCV
+        self.streaming = STREAMING_ENCODE and self.ffmpeg_available
+        # Chunks are encoded while recording and joined by FFmpeg at stop
+        self.segmented = SEGMENTED_RECORDING and self.ffmpeg_available
+        
+        # FLAC/Opus are encoded by FFmpeg while recording
+        self.audio_format = AUDIO_FORMAT if self.ffmpeg_available else "wav"
+        # Crash-safe sessions keep fragmented temp files in a journaled directory
+        self.session = None
+        if CRASH_SAFE_RECORDING and self.streaming and not self.replay_mode:
+            from recorder.session import SessionJournal
+            self.session = SessionJournal.create(get_sessions_dir(), fps=fps)
+        
+        # Both recorders time their frames and blocks from this instant
+        epoch = time.monotonic()
+        
         # Start screen recorder
-        video_path = get_temp_video_path()
-        self.screen_recorder = ScreenRecorder(video_path, fps, region)
+        video_path = self._temp_video_path()
+        self.screen_recorder = QtScreenRecorder(ScreenRecorder(
+            video_path, fps, region,
+            ring_size=FRAME_RING_SIZE,
+            overflow_policy=FRAME_RING_POLICY,
+            streaming=self.streaming,
+            encoder_settings=self._encoder_settings().with_defaults(
+                preset=STREAM_PRESET, crf=STREAM_CRF
+            ),
+            skip_unchanged=SKIP_UNCHANGED_FRAMES,
+            vfr=self.vfr_checkbox.isChecked(),
+            preview_fps=PREVIEW_FPS,
+            preview_size=PREVIEW_SIZE,
+            segment_seconds=SEGMENT_SECONDS if self.segmented else None,
+            segment_workers=SEGMENT_WORKERS,
+            replay_seconds=REPLAY_SECONDS if self.replay_mode else None,
+            replay_max_bytes=REPLAY_MAX_MB * 1024 * 1024,
+            replay_quality=REPLAY_JPEG_QUALITY,
+            source=self._capture_source(),
+            epoch=epoch,
+            fragment_seconds=FRAGMENT_SECONDS if self.session else None
+        ))
         self.screen_recorder.error_occurred.connect(self._on_error)
+        self.preview_channel = QtPreviewChannel(self.screen_recorder.preview)
+        if self.preview_checkbox.isChecked():
+            self.preview_widget.attach(self.preview_channel)
         self.screen_recorder.start()
         
         # Start audio recorder if enabled
-        if self.audio_checkbox.isChecked():
-            audio_path = get_temp_audio_path()
-            self.audio_recorder = AudioRecorder(audio_path)
+        self.audio_recorder = None
+        sources = self._audio_sources()
+        if sources:
+            try:
+                from recorder.audio_recorder import AudioRecorder
+            except (ImportError, OSError):
+                # sounddevice or PortAudio missing: record video only
+                sources = []
+                self.statusBar().showMessage(
+                    "⚠️ Audio unavailable (sounddevice/PortAudio not found); recording video only",
+                    5000
+                )
+        if sources:
+            if self.replay_mode:
+                self.audio_recorder = QtAudioRecorder(AudioRecorder(
+                    None,
+                    replay_seconds=REPLAY_SECONDS,
+                    epoch=epoch,
+                    blocksize=AUDIO_BLOCKSIZE,
+                    latency=AUDIO_LATENCY,
+                    ring_seconds=AUDIO_RING_SECONDS,
+                    sources=sources
+                ))
+            else:
+                self.audio_recorder = QtAudioRecorder(AudioRecorder(
+                    self._temp_audio_path(),
+                    epoch=epoch,
+                    audio_format=self.audio_format,
+                    audio_bitrate=AUDIO_OPUS_BITRATE,
+                    blocksize=AUDIO_BLOCKSIZE,
+                    latency=AUDIO_LATENCY,
+                    ring_seconds=AUDIO_RING_SECONDS,
+                    sources=sources,
+                    separate_tracks=AUDIO_SEPARATE_TRACKS
+                ))
             self.audio_recorder.error_occurred.connect(self._on_error)
+            self.audio_recorder.stats_updated.connect(self._on_audio_stats)
             self.audio_recorder.start()
         
+        if self.session:
+            self.session.update(
+                video=video_path.name,
+                segments=f"{video_path.stem}_segments" if self.segmented else None,
+                audio=self._temp_audio_path().name if self.audio_recorder else None,
+                tracks=[[path.name, title] for path, title in self.audio_recorder.track_paths]
+                if self.audio_recorder else []
+            )
+        
         # Start recording timer
-        self.recording_timer = RecordingTimer()
+        self.recording_timer = QtRecordingTimer(RecordingTimer())
         self.recording_timer.time_updated.connect(self._on_timer_update)
         self.recording_timer.start()
     
+    def _audio_sources(self):
+        """Devices to record and mix, from the audio checkboxes."""
+        sources = list(AUDIO_SOURCES) if self.audio_checkbox.isChecked() else []
+        if self.system_audio_checkbox.isChecked() and self.loopback_device is not None:
+            sources.append({
+                "device": self.loopback_device,
+                "gain": AUDIO_LOOPBACK_GAIN,
+                "name": "System audio"
+            })
+        return sources
+    
+    @pyqtSlot(dict)
+    def _on_audio_stats(self, stats):
+        """Warn while audio is being lost to overruns."""
+        if stats["overruns"] or stats["input_overflows"]:
+            self.statusBar().showMessage(
+                f"⚠️ Audio overruns: {stats['overruns']} "
+                f"({stats['dropped_seconds']:.2f}s replaced by silence), "
+                f"device overflows: {stats['input_overflows']}",
+                5000
+            )
+    
     @pyqtSlot(str)
     def _on_timer_update(self, time_str):
         """Update timer display."""
@@ -299,6 +669,8 @@ class MainWindow(QMainWindow):
         self.status_label.setStyleSheet("color: orange;")
         self.stop_btn.setEnabled(False)
         
+        self.preview_widget.detach()
+        
         # Stop timers
         if self.recording_timer:
             self.recording_timer.stop()
@@ -313,6 +685,26 @@ class MainWindow(QMainWindow):
             self.audio_recorder.stop_recording()
             self.audio_recorder.wait()
         
+        if self.replay_mode:
+            # Nothing was written to disk; replays are saved on demand
+            self.save_replay_btn.setEnabled(False)
+            self._reset_ui()
+            return
+        
+        self.session_summary = self._format_session_summary()
+        
+        from recorder.sync import audio_sync
+        sync = audio_sync(
+            self.screen_recorder, self.audio_recorder
+        ) if AV_SYNC_CORRECTION and self.audio_recorder else None
+        if self.session:
+            from recorder.session import STATE_STOPPED
+            self.session.update(
+                state=STATE_STOPPED,
+                duration=self.screen_recorder.duration if self.screen_recorder else None,
+                audio_sync=sync
+            )
+        
         # Choose output location
         default_path = str(get_output_path())
         output_path, _ = QFileDialog.getSaveFileName(
@@ -323,47 +715,215 @@ class MainWindow(QMainWindow):
         )
         
         if output_path:
+            from recorder.encoder import VideoEncoder
+            
             # Start encoding
-            video_path = get_temp_video_path()
-            audio_path = get_temp_audio_path() if self.audio_checkbox.isChecked() else None
+            video_path = self._temp_video_path()
+            audio_path = self._temp_audio_path() if self.audio_recorder else None
             
-            self.encoder = VideoEncoder(video_path, audio_path, output_path)
+            self.encoder = QtVideoEncoder(VideoEncoder(
+                video_path, audio_path, output_path,
+                profile=self.profile_combo.currentData(),
+                settings=self._encoder_settings(),
+                duration=self.screen_recorder.duration if self.screen_recorder else None,
+                audio_sync=sync,
+                extra_audio=self.audio_recorder.track_paths if self.audio_recorder else None,
+                segments=self.screen_recorder.segments if self.screen_recorder else None
+            ))
             self.encoder.progress_updated.connect(self._on_encoding_progress)
+            self.encoder.progress_stats.connect(self._on_encoding_stats)
             self.encoder.encoding_finished.connect(self._on_encoding_finished)
+            
+            self.encode_progress.setValue(0)
+            self.encode_progress.setRange(0, 0)  # Busy until the first report
+            self.encode_progress.setVisible(True)
+            self.cancel_encode_btn.setEnabled(True)
+            self.cancel_encode_btn.setVisible(True)
             self.encoder.start()
         else:
             # Cancelled, reset UI
+            if self.session:
+                self.session.discard()
             self._reset_ui()
     
+    @pyqtSlot()
+    def _save_replay(self):
+        """Save the replay buffer contents to a file in the background."""
+        if not (self.is_recording and self.replay_mode and self.screen_recorder):
+            return
+        from recorder.replay import ReplaySaver
+        
+        fps = self.screen_recorder.fps
+        frames = self.screen_recorder.replay.snapshot()
+        audio = None
+        if self.audio_recorder and self.audio_recorder.replay is not None:
+            audio = self.audio_recorder.replay.snapshot(len(frames) / fps)
+        
+        saver = QtReplaySaver(ReplaySaver(
+            frames, fps, get_replay_path(), audio,
+            sample_rate=self.audio_recorder.sample_rate if self.audio_recorder else 44100,
+            settings=self._encoder_settings().with_defaults(
+                preset=STREAM_PRESET, crf=STREAM_CRF
+            )
+        ))
+        saver.save_finished.connect(self._on_replay_saved)
+        saver.save_finished.connect(lambda *_: self.replay_savers.remove(saver))
+        self.replay_savers.append(saver)
+        self.statusBar().showMessage("Saving replay...")
+        saver.start()
+    
+    @pyqtSlot(bool, str)
+    def _on_replay_saved(self, success, message):
+        """Report a finished replay save without interrupting the session."""
+        if success:
+            self.statusBar().showMessage(message, 10000)
+        else:
+            self.statusBar().clearMessage()
+            QMessageBox.critical(self, "Replay Error", message)
+    
+    def _encoder_settings(self):
+        """
+        Encoder options from the configuration.
+        
+        Preset and CRF are left to the save profile; recording uses
+        STREAM_PRESET and STREAM_CRF.
+        """
+        from recorder.encoder_settings import EncoderSettings
+        
+        return EncoderSettings(
+            bitrate=ENCODER_BITRATE,
+            tune=ENCODER_TUNE,
+            threads=ENCODER_THREADS,
+            gop=ENCODER_GOP,
+            pix_fmt=ENCODER_PIX_FMT,
+            nice=ENCODER_NICE,
+            cpu_affinity=ENCODER_CPU_AFFINITY
+        )
+    
+    def _temp_video_path(self):
+        """Streaming and segmented recordings produce an H.264 MP4."""
+        if self.session:
+            return self.session.path("video.mp4")
+        return get_temp_video_path(self.streaming or self.segmented)
+    
+    def _temp_audio_path(self):
+        """Temporary audio file of the current recording."""
+        if self.session:
+            return self.session.path(f"audio.{self.audio_format}")
+        return get_temp_audio_path(self.audio_format)
+    
+    def _format_session_summary(self):
+        """Summarize capture statistics for the completion message."""
+        if not self.screen_recorder:
+            return ""
+        
+        lines = []
+        convert = self.screen_recorder.get_stats()["convert"]
+        if "skipped" in convert:
+            lines.append(
+                f"Unchanged frames skipped: {convert['skip_ratio']:.0%} "
+                f"(~{convert['cpu_saved']:.1f}s CPU saved)"
+            )
+        if self.audio_recorder:
+            audio = self.audio_recorder.get_stats()
+            if audio["overruns"] or audio["input_overflows"]:
+                lines.append(
+                    f"Audio overruns: {audio['overruns']} "
+                    f"({audio['dropped_seconds']:.2f}s lost), "
+                    f"device overflows: {audio['input_overflows']}"
+                )
+        return "\n".join(lines)
+    
     @pyqtSlot(str)
     def _on_encoding_progress(self, message):
         """Handle encoding progress."""
         self.status_label.setText(f"⚙️ {message}")
     
+    @pyqtSlot(dict)
+    def _on_encoding_stats(self, stats):
+        """Update the encoding progress bar."""
+        if stats["percent"] is not None:
+            self.encode_progress.setRange(0, 100)
+            self.encode_progress.setValue(int(stats["percent"]))
+    
+    @pyqtSlot()
+    def _cancel_encoding(self):
+        """Stop FFmpeg and discard the partial output."""
+        if self.encoder and self.encoder.isRunning():
+            self.cancel_encode_btn.setEnabled(False)
+            self.status_label.setText("⚙️ Cancelling...")
+            self.encoder.cancel()
+    
     @pyqtSlot(bool, str)
     def _on_encoding_finished(self, success, message):
         """Handle encoding completion."""
+        self.encode_progress.setVisible(False)
+        self.cancel_encode_btn.setVisible(False)
+        
+        if self.encoder and self.encoder.cancelled:
+            # Temp files are kept, nothing else to report
+            self._reset_ui()
+            self.status_label.setText("⚫ Encoding cancelled")
+            return
+        
         if success:
+            if self.session:
+                self.session.discard()
+            if METRICS_SIDECAR:
+                self._write_metrics_sidecar()
+            if self.session_summary:
+                message = f"{message}\n\n{self.session_summary}"
             QMessageBox.information(self, "Success", message)
             self.status_label.setText("✅ Ready")
             self.status_label.setStyleSheet("color: green;")
         else:
+            if self.session:
+                message += "\n\nThe recording will be offered for recovery at the next start."
             QMessageBox.critical(self, "Error", message)
             self.status_label.setText("❌ Error")
             self.status_label.setStyleSheet("color: red;")
         
         self._reset_ui()
     
+    def _write_metrics_sidecar(self):
+        """Save session telemetry next to the recording."""
+        from recorder.metrics import write_sidecar
+        
+        try:
+            write_sidecar(self.encoder.output_path, self._session_metrics())
+        except OSError as e:
+            print(f"Metrics sidecar error: {e}")
+    
     @pyqtSlot(str)
     def _on_error(self, error_message):
         """Handle recording error."""
+        if self.session:
+            self._close_failed_session()
         QMessageBox.critical(self, "Recording Error", error_message)
         self.is_recording = False
         self._reset_ui()
     
+    def _close_failed_session(self):
+        """Stop a failed crash-safe recording; drop its session if it recorded nothing."""
+        if self.recording_timer:
+            self.recording_timer.stop()
+            self.recording_timer.wait()
+        for recorder in (self.screen_recorder, self.audio_recorder):
+            if recorder:
+                recorder.stop_recording()
+                recorder.wait()
+        written = (self.screen_recorder and self.screen_recorder.frames_written) or (
+            self.audio_recorder and self.audio_recorder.frames_written
+        )
+        if not written:
+            self.session.discard()
+        self.session = None
+    
     def _reset_ui(self):
         """Reset UI to ready state."""
         self.timer_label.setText("00:00:00")
+        self.preview_widget.detach()
+        self.preview_widget.clear_preview()
         self.status_label.setText("⚫ Ready")
         self.status_label.setStyleSheet("")
         
@@ -371,11 +931,13 @@ class MainWindow(QMainWindow):
         self.stop_btn.setEnabled(False)
         self.mode_combo.setEnabled(True)
         self.fps_spinbox.setEnabled(True)
+        self.vfr_checkbox.setEnabled(self._can_use_vfr())
+        self.replay_checkbox.setEnabled(self.ffmpeg_available)
+        self.save_replay_btn.setEnabled(False)
+        self.audio_checkbox.setEnabled(self.microphone_available)
+        self.system_audio_checkbox.setEnabled(self.loopback_device is not None)
         
-        if AudioRecorder.check_microphone():
-            self.audio_checkbox.setEnabled(True)
-        
-        if self.mode_combo.currentText() == "Selected Region":
+        if self.mode_combo.currentText() in ("Selected Region", "Multiple Regions"):
             self.select_region_btn.setEnabled(True)
     
     def closeEvent(self, event):
@@ -384,6 +946,9 @@ class MainWindow(QMainWindow):
         if self.hotkey_handler:
             self.hotkey_handler.stop()
         
+        if self.metrics_server:
+            self.metrics_server.stop()
+        
         # Stop recording if active
         if self.is_recording:
             reply = QMessageBox.question(
@@ -401,5 +966,24 @@ class MainWindow(QMainWindow):
                 event.accept()
             else:
                 event.ignore()
+        elif self.encoder and self.encoder.isRunning():
+            reply = QMessageBox.question(
+                self,
+                "Encoding in Progress",
+                "The recording is still being saved. Cancel and exit?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            
+            if reply == QMessageBox.Yes:
+                self.encoder.cancel()
+                self.encoder.wait()
+                event.accept()
+            else:
+                event.ignore()
         else:
             event.accept()
+        
+        if event.isAccepted():
+            # Let in-flight replay saves finish writing their files
+            for saver in list(self.replay_savers):
+                saver.wait()
@@ -0,0 +1,48 @@
+"""
+Live preview widget for the screen recorder.
+"""
+from PyQt5.QtWidgets import QLabel
+from PyQt5.QtCore import Qt, pyqtSlot
+from PyQt5.QtGui import QImage, QPixmap
+
+
+class PreviewWidget(QLabel):
+    """Label that displays frames from a PreviewChannel."""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._channel = None
+        self.setAlignment(Qt.AlignCenter)
+        self.setMinimumSize(320, 180)
+        self.setStyleSheet("background-color: black; color: gray;")
+        self.clear_preview()
+    
+    def attach(self, channel):
+        """Start showing frames from a preview channel."""
+        self.detach()
+        self._channel = channel
+        channel.frame_ready.connect(self.show_frame)
+    
+    def detach(self):
+        """Stop receiving frames; the channel then skips preview work."""
+        if self._channel:
+            try:
+                self._channel.frame_ready.disconnect(self.show_frame)
+            except TypeError:
+                pass
+            self._channel = None
+    
+    def clear_preview(self):
+        """Show the idle placeholder."""
+        self.clear()
+        self.setText("No preview")
+    
+    @pyqtSlot(object)
+    def show_frame(self, frame):
+        """Display a small BGR frame."""
+        height, width = frame.shape[:2]
+        image = QImage(
+            frame.data, width, height, frame.strides[0], QImage.Format_BGR888
+        )
+        # QImage only wraps the array, so copy before the array goes away
+        self.setPixmap(QPixmap.fromImage(image.copy()))
@@ -1,5 +1,9 @@
 """
 Region selector widget for selecting screen area to record.
+
+The overlay spans the whole virtual desktop (every connected screen), and
+selected regions are reported in desktop coordinates. In multi mode several
+regions can be drawn and are confirmed with Enter.
 """
 from PyQt5.QtWidgets import QWidget, QRubberBand
 from PyQt5.QtCore import Qt, QRect, QPoint, pyqtSignal
@@ -10,9 +14,11 @@ class RegionSelector(QWidget):
     """Transparent overlay for selecting screen region."""
     
     region_selected = pyqtSignal(tuple)  # (x, y, width, height)
+    regions_selected = pyqtSignal(list)  # [(x, y, width, height), ...]
     
-    def __init__(self):
+    def __init__(self, multi=False):
         super().__init__()
+        self.multi = multi
         self.setWindowFlags(
             Qt.WindowStaysOnTopHint |
             Qt.FramelessWindowHint |
@@ -21,27 +27,38 @@ class RegionSelector(QWidget):
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.setWindowOpacity(0.3)
         
-        # Get screen geometry
+        # Cover the virtual desktop spanning all screens
         from PyQt5.QtWidgets import QApplication
-        screen = QApplication.primaryScreen().geometry()
-        self.setGeometry(screen)
+        desktop = QRect()
+        for screen in QApplication.screens():
+            desktop = desktop.united(screen.geometry())
+        self.setGeometry(desktop)
         
         self.rubber_band = QRubberBand(QRubberBand.Rectangle, self)
         self.origin = QPoint()
         self.selected_region = None
+        self.selected_regions = []  # Multi mode, in widget coordinates
     
     def paintEvent(self, event):
         """Draw semi-transparent overlay."""
         painter = QPainter(self)
         painter.fillRect(self.rect(), QColor(0, 0, 0, 100))
         
+        # Outline regions already picked in multi mode
+        painter.setPen(QPen(Qt.red, 2))
+        for rect in self.selected_regions:
+            painter.drawRect(rect)
+        
         # Draw instructions
+        if self.multi:
+            text = (
+                "Click and drag to add regions\n"
+                "Press ENTER to confirm, BACKSPACE to undo, ESC to cancel"
+            )
+        else:
+            text = "Click and drag to select region\nPress ESC to cancel"
         painter.setPen(QPen(Qt.white, 2))
-        painter.drawText(
-            self.rect(),
-            Qt.AlignCenter,
-            "Click and drag to select region\nPress ESC to cancel"
-        )
+        painter.drawText(self.rect(), Qt.AlignCenter, text)
     
     def mousePressEvent(self, event):
         """Handle mouse press."""
@@ -64,19 +81,38 @@ class RegionSelector(QWidget):
             
             if rect.width() > 10 and rect.height() > 10:
                 # Valid selection
-                self.selected_region = (
-                    rect.x(),
-                    rect.y(),
-                    rect.width(),
-                    rect.height()
-                )
+                if self.multi:
+                    self.selected_regions.append(rect)
+                    self.rubber_band.hide()
+                    self.update()
+                    return
+                self.selected_region = self._to_desktop(rect)
                 self.region_selected.emit(self.selected_region)
                 self.close()
             else:
                 # Too small, cancel
                 self.rubber_band.hide()
     
+    def _to_desktop(self, rect):
+        """Convert a widget rectangle to desktop (x, y, width, height)."""
+        origin = self.geometry().topLeft()
+        return (
+            rect.x() + origin.x(),
+            rect.y() + origin.y(),
+            rect.width(),
+            rect.height()
+        )
+    
     def keyPressEvent(self, event):
         """Handle key press."""
         if event.key() == Qt.Key_Escape:
             self.close()
+        elif self.multi and event.key() in (Qt.Key_Return, Qt.Key_Enter):
+            if self.selected_regions:
+                self.regions_selected.emit(
+                    [self._to_desktop(rect) for rect in self.selected_regions]
+                )
+            self.close()
+        elif self.multi and event.key() == Qt.Key_Backspace and self.selected_regions:
+            self.selected_regions.pop()
+            self.update()
@@ -2,7 +2,6 @@
 Configuration module for screen recorder.
 Contains default settings and paths.
 """
-import os
 from pathlib import Path
 
 # Application settings
@@ -15,10 +14,123 @@ DEFAULT_CODEC = "mp4v"
 DEFAULT_AUDIO_SAMPLE_RATE = 44100
 DEFAULT_AUDIO_CHANNELS = 2
 
+# Audio input: frames per callback (0 lets PortAudio choose), device
+# latency ("low", "high" or seconds; None keeps the device default) and the
+# seconds of audio the callback ring can hold while the writer catches up
+AUDIO_BLOCKSIZE = 0
+AUDIO_LATENCY = "high"
+AUDIO_RING_SECONDS = 2.0
+
+# Audio sources recorded together and mixed (see recorder/mixer.py). Each
+# is {"device": PortAudio index or name (None = default input), "gain":
+# linear gain, "name": track title}; the first one is the sync master.
+# AUDIO_LOOPBACK_DEVICE is the source added by "Record system audio":
+# "auto" picks the first monitor/loopback input found, or name a device.
+# AUDIO_SEPARATE_TRACKS also writes each source as its own audio track.
+AUDIO_SOURCES = [{"device": None, "gain": 1.0, "name": "Microphone"}]
+AUDIO_LOOPBACK_DEVICE = "auto"
+AUDIO_LOOPBACK_GAIN = 1.0
+AUDIO_SEPARATE_TRACKS = False
+
+# Multi-region / multi-monitor capture: regions are placed side by side
+# ("row") or keep their on-screen arrangement ("desktop"); each region is
+# grabbed on its own thread (None = one worker per region)
+CAPTURE_LAYOUTS = ("row", "desktop")
+CAPTURE_LAYOUT = "row"
+CAPTURE_WORKERS = None
+
+# Capture pipeline settings
+FRAME_RING_SIZE = 8  # Preallocated frame buffers between pipeline stages
+FRAME_RING_POLICY = "block"  # When a ring is full: block, drop_oldest or drop_newest
+
+# Streaming encode: pipe frames straight into FFmpeg (falls back to
+# OpenCV + a second FFmpeg pass when FFmpeg is not available)
+STREAMING_ENCODE = True
+# Preset and CRF of the encodes made while recording; the save profile
+# picks its own for the final encode
+STREAM_PRESET = "veryfast"
+STREAM_CRF = 23
+
+# libx264 options and scheduling applied to every FFmpeg encode (streaming,
+# segments, replays and the final save)
+ENCODER_THREADS = 0  # 0 lets x264 decide
+ENCODER_TUNE = None  # e.g. "zerolatency" or "stillimage"
+ENCODER_BITRATE = None  # e.g. "8M"; replaces STREAM_CRF when set
+ENCODER_GOP = None  # Keyframe interval in frames; None keeps FFmpeg's default
+ENCODER_PIX_FMT = "yuv420p"
+ENCODER_NICE = 5  # Run FFmpeg at lower priority so capture is not starved
+ENCODER_CPU_AFFINITY = None  # e.g. [4, 5, 6, 7] to pin FFmpeg (Linux only)
+
+# Segmented recording: rotate to a new chunk every SEGMENT_SECONDS and
+# encode finished chunks in the background, so saving only has to encode
+# the last chunk and join the rest (needs FFmpeg; disables VFR)
+SEGMENTED_RECORDING = False
+SEGMENT_SECONDS = 60
+SEGMENT_WORKERS = 2
+
+# Replay buffer: keep only the last REPLAY_SECONDS in memory and save them
+# on demand (HOTKEY_SAVE_REPLAY). Frames are held as JPEG; the oldest are
+# dropped early if they exceed REPLAY_MAX_MB.
+REPLAY_SECONDS = 60
+REPLAY_MAX_MB = 512
+REPLAY_JPEG_QUALITY = 80
+
+# Encode profile used when saving: copy (stream-copy whatever the container
+# takes), fast (copy H.264, else veryfast) or quality (always re-encode with
+# the medium preset, which takes about as long as the recording or longer)
+DEFAULT_ENCODE_PROFILE = "fast"
+ENCODE_PROFILE_LABELS = {
+    "copy": "Copy (no re-encode when possible)",
+    "fast": "Fast (copy H.264, else veryfast)",
+    "quality": "Quality (re-encode, medium)",
+}
+
+# Temporary audio format: "wav" (uncompressed, ~10 MB/min), or "flac"
+# (lossless) / "opus" encoded by FFmpeg while recording. The compressed
+# formats cut temp disk I/O several-fold, and MP4/MKV saves copy them
+# instead of converting to AAC. Without FFmpeg WAV is always used.
+AUDIO_FORMATS = ("wav", "flac", "opus")
+AUDIO_FORMAT = "wav"
+AUDIO_OPUS_BITRATE = "128k"
+
+# Line the audio up with the video when saving: shift it by its measured
+# start offset and correct sound card clock drift (see recorder/sync.py)
+AV_SYNC_CORRECTION = True
+
+# Skip conversion/encoding work for frames identical to the previous one
+SKIP_UNCHANGED_FRAMES = True
+
+# Variable frame rate: write only changed frames with their capture times
+# (requires the streaming encoder)
+DEFAULT_VFR = False
+
+# Live preview (downscaled and rate-limited off the GUI thread)
+SHOW_PREVIEW = True
+PREVIEW_FPS = 10
+PREVIEW_SIZE = (320, 180)  # Bounding box (width, height)
+
+# Crash-safe recording: each session's temporary files live in their own
+# directory under SESSIONS_DIR next to a session.json journal, and the
+# streaming encoder writes fragmented MP4 (a new fragment every
+# FRAGMENT_SECONDS), so a crash loses at most the last fragment. Sessions
+# left behind are offered for recovery at the next start (or with
+# python cli.py --recover) and rebuilt into an MKV without re-encoding.
+CRASH_SAFE_RECORDING = True
+FRAGMENT_SECONDS = 1.0
+
+# Telemetry: write <recording>.metrics.json next to each saved recording,
+# and optionally serve live metrics as Prometheus text on
+# http://METRICS_HOST:METRICS_PORT/metrics (None disables the endpoint)
+METRICS_SIDECAR = True
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = None
+
 # File settings
 OUTPUT_DIR = Path(__file__).parent.parent / "output" / "recordings"
 TEMP_VIDEO_NAME = "temp_video.avi"
-TEMP_AUDIO_NAME = "temp_audio.wav"
+TEMP_STREAM_VIDEO_NAME = "temp_video.mp4"
+TEMP_AUDIO_STEM = "temp_audio"
+SESSIONS_DIR = OUTPUT_DIR / "sessions"
 DEFAULT_OUTPUT_FORMAT = "mp4"
 
 # UI settings
@@ -28,29 +140,48 @@ TIMER_UPDATE_INTERVAL = 100  # milliseconds
 # Hotkey settings
 HOTKEY_START = "ctrl+shift+r"
 HOTKEY_STOP = "ctrl+shift+s"
+HOTKEY_SAVE_REPLAY = "ctrl+shift+b"
+
+
+def get_output_dir():
+    """Get the output directory, creating it on first use."""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    return OUTPUT_DIR
 
-# Ensure output directory exists
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+def get_sessions_dir():
+    """Get the directory of crash-safe session journals, creating it."""
+    SESSIONS_DIR.mkdir(parents=True, exist_ok=True)
+    return SESSIONS_DIR
 
-def get_temp_video_path():
+
+def get_temp_video_path(streaming=False):
     """Get temporary video file path."""
-    return OUTPUT_DIR / TEMP_VIDEO_NAME
+    if streaming:
+        return get_output_dir() / TEMP_STREAM_VIDEO_NAME
+    return get_output_dir() / TEMP_VIDEO_NAME
 
 
-def get_temp_audio_path():
-    """Get temporary audio file path."""
-    return OUTPUT_DIR / TEMP_AUDIO_NAME
+def get_temp_audio_path(audio_format=None):
+    """Get temporary audio file path for an AUDIO_FORMATS entry."""
+    return get_output_dir() / f"{TEMP_AUDIO_STEM}.{audio_format or AUDIO_FORMAT}"
 
 
 def get_output_path(filename=None):
     """Get output file path with timestamp if no filename provided."""
     if filename:
-        return OUTPUT_DIR / filename
+        return get_output_dir() / filename
     
     from datetime import datetime
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return OUTPUT_DIR / f"recording_{timestamp}.{DEFAULT_OUTPUT_FORMAT}"
+    return get_output_dir() / f"recording_{timestamp}.{DEFAULT_OUTPUT_FORMAT}"
+
+
+def get_replay_path():
+    """Get a timestamped output path for a saved replay."""
+    from datetime import datetime
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return get_output_dir() / f"replay_{timestamp}.mp4"
 
 
 def check_ffmpeg():
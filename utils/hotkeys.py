@@ -2,7 +2,6 @@
 Global hotkey handler for screen recorder.
 """
 from PyQt5.QtCore import QObject, pyqtSignal, QThread
-import keyboard
 
 
 class HotkeyHandler(QThread):
@@ -10,20 +9,27 @@ class HotkeyHandler(QThread):
     
     start_recording = pyqtSignal()
     stop_recording = pyqtSignal()
+    save_replay = pyqtSignal()
     
-    def __init__(self, start_key="ctrl+shift+r", stop_key="ctrl+shift+s"):
+    def __init__(self, start_key="ctrl+shift+r", stop_key="ctrl+shift+s",
+                 replay_key=None):
         super().__init__()
         self.start_key = start_key
         self.stop_key = stop_key
+        self.replay_key = replay_key
         self._is_running = True
         self._registered = False
     
     def run(self):
         """Register and listen for hotkeys."""
         try:
+            import keyboard  # Loaded here to keep it off the startup path
+            
             # Register hotkeys
             keyboard.add_hotkey(self.start_key, self._on_start)
             keyboard.add_hotkey(self.stop_key, self._on_stop)
+            if self.replay_key:
+                keyboard.add_hotkey(self.replay_key, self._on_save_replay)
             self._registered = True
             
             # Keep the thread alive
@@ -45,12 +51,20 @@ class HotkeyHandler(QThread):
         if self._is_running:
             self.stop_recording.emit()
     
+    def _on_save_replay(self):
+        """Handle save replay hotkey."""
+        if self._is_running:
+            self.save_replay.emit()
+    
     def _unregister(self):
         """Unregister hotkeys."""
         if self._registered:
             try:
+                import keyboard
                 keyboard.remove_hotkey(self.start_key)
                 keyboard.remove_hotkey(self.stop_key)
+                if self.replay_key:
+                    keyboard.remove_hotkey(self.replay_key)
                 self._registered = False
             except:
                 pass
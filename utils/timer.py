@@ -1,18 +1,18 @@
 """
 Timer utility for countdown and recording duration.
 """
-from PyQt5.QtCore import QThread, pyqtSignal
 import time
 
+from recorder.core import Signal, Worker
 
-class CountdownTimer(QThread):
+
+class CountdownTimer(Worker):
     """Countdown timer that runs in a separate thread."""
     
-    tick = pyqtSignal(int)  # Emits remaining seconds
-    finished = pyqtSignal()  # Emits when countdown finishes
-    
     def __init__(self, seconds=3):
         super().__init__()
+        self.tick = Signal()  # (remaining seconds)
+        self.finished = Signal()  # Emitted when the countdown completes
         self.seconds = seconds
         self._is_running = True
     
@@ -32,13 +32,12 @@ class CountdownTimer(QThread):
         self._is_running = False
 
 
-class RecordingTimer(QThread):
+class RecordingTimer(Worker):
     """Timer to track recording duration."""
     
-    time_updated = pyqtSignal(str)  # Emits formatted time string
-    
     def __init__(self):
         super().__init__()
+        self.time_updated = Signal()  # (formatted time string)
         self._is_running = True
         self.start_time = None
     